@@ -0,0 +1,146 @@
+"""
+Compare per-row ``update_or_create`` against ``bulk_upsert`` for Subscription rows.
+
+Run from the repository root::
+
+    python benchmarks/bulk_upsert.py --rows 20000
+
+The benchmark runs against a throw-away test database created from the
+configured ``DJANGO_SETTINGS_MODULE`` (``settings`` by default), so pointing it
+at a settings module with a PostgreSQL ``DATABASES`` entry benchmarks that
+backend instead of SQLite.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+
+from djrazorpay.models import Customer, Plan, PlanItem, Subscription  # noqa: E402
+from djrazorpay.utils import chunked  # noqa: E402
+
+CREATED_AT = 1700000000
+
+
+def subscription_fields(index: int, plan: Plan, customer: Customer) -> dict:
+    return {
+        "plan": plan,
+        "customer": customer,
+        "status": "active",
+        "current_start": CREATED_AT,
+        "current_end": CREATED_AT + 30 * 86400,
+        "ended_at": None,
+        "quantity": 1,
+        "charge_at": CREATED_AT + 30 * 86400,
+        "start_at": CREATED_AT,
+        "end_at": None,
+        "auth_attempts": 0,
+        "total_count": 12,
+        "paid_count": index % 12,
+        "customer_notify": True,
+        "created_at": CREATED_AT,
+        "expire_by": None,
+        "short_url": f"https://rzp.io/i/{index}",
+        "has_scheduled_changes": False,
+        "change_scheduled_at": None,
+        "source": "api",
+        "offer_id": None,
+        "remaining_count": 12 - index % 12,
+    }
+
+
+def seed() -> tuple[Plan, Customer]:
+    item = PlanItem.objects.create(
+        id="item_bench",
+        active=True,
+        name="Bench",
+        description="",
+        amount=100,
+        unit_amount=100,
+        currency="INR",
+        type="plan",
+        tax_inclusive=False,
+        created_at=CREATED_AT,
+        updated_at=CREATED_AT,
+    )
+    plan = Plan.objects.create(
+        id="plan_bench", interval=1, period="monthly", item=item, created_at=CREATED_AT
+    )
+    customer = Customer.objects.create(
+        id="cust_bench",
+        name="Bench",
+        email="bench@example.com",
+        contact="0000000000",
+        created_at=CREATED_AT,
+    )
+    return plan, customer
+
+
+def run_update_or_create(rows: int, plan: Plan, customer: Customer) -> float:
+    start = time.perf_counter()
+    for index in range(rows):
+        Subscription.objects.update_or_create(
+            id=f"sub_{index:08d}", defaults=subscription_fields(index, plan, customer)
+        )
+    return time.perf_counter() - start
+
+
+def run_bulk_upsert(
+    rows: int, batch_size: int, plan: Plan, customer: Customer
+) -> float:
+    start = time.perf_counter()
+    for batch in chunked(range(rows), batch_size):
+        objs = [
+            Subscription(
+                id=f"sub_{index:08d}", **subscription_fields(index, plan, customer)
+            )
+            for index in batch
+        ]
+        with transaction.atomic():
+            Subscription.objects.bulk_upsert(objs)
+    return time.perf_counter() - start
+
+
+def report(label: str, rows: int, elapsed: float) -> None:
+    print(f"{label:<28} {rows:>8} rows {elapsed:>9.2f}s {rows / elapsed:>12.0f} rows/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        print(f"backend: {connection.vendor}")
+        plan, customer = seed()
+        for phase in ("insert", "update"):
+            report(
+                f"update_or_create ({phase})",
+                args.rows,
+                run_update_or_create(args.rows, plan, customer),
+            )
+        Subscription.objects.all().delete()
+        for phase in ("insert", "update"):
+            report(
+                f"bulk_upsert ({phase})",
+                args.rows,
+                run_bulk_upsert(args.rows, args.batch_size, plan, customer),
+            )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark djrazorpay_sync_models against synthetic Razorpay accounts.
+
+Run from the repository root::
+
+    python benchmarks/sync.py 1000 100000 1000000 --workers 4 --latency 0.05
+
+Each size is synced in a fresh subprocess, against the fake client from
+``djrazorpay.testing`` and a throw-away test database created from the
+configured ``DJANGO_SETTINGS_MODULE`` (``settings`` by default), and reports
+wall time, database queries, API calls, peak RSS and rows/sec.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_single(args: argparse.Namespace, subscriptions: int) -> dict:
+    import django
+
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import setup_databases, teardown_databases
+
+    from djrazorpay.management.commands.djrazorpay_sync_models import Command
+    from djrazorpay.testing import FakeClient
+
+    client = FakeClient(
+        plans=args.plans,
+        customers=args.customers,
+        subscriptions=subscriptions,
+        latency=args.latency,
+        rate_limit_ratio=args.rate_limit_ratio,
+    )
+    command = Command()
+    command.client_class = client
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        with open(os.devnull, "w") as devnull, connection.execute_wrapper(
+            count_queries
+        ):
+            start = time.perf_counter()
+            call_command(
+                command,
+                "bench",
+                "bench",
+                "--batch-size",
+                str(args.batch_size),
+                "--workers",
+                str(args.workers),
+                stdout=devnull,
+                stderr=devnull,
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    rows = args.plans + args.customers + subscriptions
+    return {
+        "backend": connection.vendor,
+        "subscriptions": subscriptions,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "queries": queries,
+        "api_calls": client.calls,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rows_per_second": round(rows / elapsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "sizes", type=int, nargs="*", default=[1000], help="Subscriptions per run."
+    )
+    parser.add_argument("--plans", type=int, default=10)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to each API call."
+    )
+    parser.add_argument(
+        "--rate-limit-ratio",
+        type=float,
+        default=0.0,
+        help="Fraction of API calls failing with 'Too many requests'.",
+    )
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--json", action="store_true", help="Print one JSON object per run."
+    )
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_single(args, args.single)))
+        return
+
+    if not args.json:
+        print(
+            f"{'subscriptions':>13} {'seconds':>9} {'queries':>9} {'api calls':>10} "
+            f"{'peak MB':>8} {'rows/s':>9}"
+        )
+    for size in args.sizes:
+        argv = [
+            f"--plans={args.plans}",
+            f"--customers={args.customers}",
+            f"--batch-size={args.batch_size}",
+            f"--workers={args.workers}",
+            f"--latency={args.latency}",
+            f"--rate-limit-ratio={args.rate_limit_ratio}",
+            f"--single={size}",
+        ]
+        output = subprocess.run(
+            [sys.executable, __file__, *argv],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(
+                f"{result['subscriptions']:>13} {result['seconds']:>9.2f} "
+                f"{result['queries']:>9} {result['api_calls']:>10} "
+                f"{result['peak_rss_mb']:>8.1f} {result['rows_per_second']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
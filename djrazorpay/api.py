@@ -0,0 +1,293 @@
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any
+
+import razorpay
+import requests
+from django.conf import settings
+
+if TYPE_CHECKING:
+    from djrazorpay.stats import SyncStats
+
+# Largest ``count`` the Razorpay list endpoints accept.
+MAX_PAGE_SIZE = 100
+
+
+def iter_pages(
+    resource: Any, count: int = MAX_PAGE_SIZE, **filters: Any
+) -> Iterator[list[dict]]:
+    """
+    Walk every page of a Razorpay collection (e.g. ``client.subscription``),
+    yielding the items of each page as soon as it is fetched. ``filters`` are
+    passed through to the list endpoint (``from``, ``to``, ...).
+    """
+    skip = 0
+    while True:
+        response = resource.all({**filters, "count": count, "skip": skip})
+        items = response["items"]
+        if items:
+            yield items
+        if len(items) < count:
+            return
+        skip += count
+
+
+def iter_entities(
+    resource: Any, count: int = MAX_PAGE_SIZE, **filters: Any
+) -> Iterator[dict]:
+    """Yield every entity of a Razorpay collection, one page in memory at a time."""
+    for page in iter_pages(resource, count, **filters):
+        yield from page
+
+
+def iter_pages_concurrently(
+    resource: Any,
+    executor: Executor,
+    window: int,
+    count: int = MAX_PAGE_SIZE,
+    **filters: Any,
+) -> Iterator[list[dict]]:
+    """
+    Like ``iter_pages``, but keeps up to ``window`` page requests in flight on
+    ``executor``. Pages are still yielded in order. Since the collection size
+    is unknown, up to ``window - 1`` requests past the last page are wasted.
+    """
+
+    def fetch(skip: int) -> list[dict]:
+        return resource.all({**filters, "count": count, "skip": skip})["items"]
+
+    pending: deque[Future] = deque()
+    skip = 0
+    try:
+        while True:
+            while len(pending) < window:
+                pending.append(executor.submit(fetch, skip))
+                skip += count
+            items = pending.popleft().result()
+            if items:
+                yield items
+            if len(items) < count:
+                return
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` calls per second on average and bursts of up to ``burst``.
+    ``acquire`` blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    Caps the number of calls in flight with an AIMD limit. Every successful
+    call raises the limit by ``1 / limit``, about one per round of calls, and
+    every throttled call halves it, so the limit settles just under the
+    concurrency the API tolerates.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def succeeded(self) -> None:
+        with self.condition:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def throttled(self) -> None:
+        with self.condition:
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+def retry_after(response: requests.Response | None) -> float | None:
+    """Seconds to wait according to the ``Retry-After`` header of ``response``."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class ApiResource:
+    """
+    Wraps a resource of ``razorpay.Client`` (``client.plan``, ...) so that every
+    ``all``/``fetch`` call goes through the rate limiting and retries of
+    ``api``, and is timed into its stats.
+    """
+
+    def __init__(self, resource: Any, api: "ApiClient") -> None:
+        self.resource = resource
+        self.api = api
+
+    def all(self, data: dict | None = None, **kwargs: Any) -> dict:
+        return self.api.call(self.resource.all, data or {}, **kwargs)
+
+    def fetch(self, entity_id: str, data: dict | None = None, **kwargs: Any) -> dict:
+        return self.api.call(self.resource.fetch, entity_id, data or {}, **kwargs)
+
+
+class ApiClient:
+    """
+    Wraps ``razorpay.Client``, exposing its resources as ``ApiResource``.
+    Only the list/fetch calls the sync needs go through the wrapper.
+
+    Calls share a token bucket (when ``RATE`` is set) and an adaptive
+    concurrency limit. Throttled (429), server-side (5xx) and connection
+    failures are retried up to ``MAX_RETRIES`` times, after the
+    ``Retry-After`` the API asked for or else a jittered exponential backoff.
+    Options come from the ``DJRAZORPAY_API`` setting; see ``DEFAULT_OPTIONS``.
+    """
+
+    DEFAULT_OPTIONS = {
+        # Calls per second and burst size of the token bucket; None disables it.
+        "RATE": None,
+        "BURST": 10,
+        "MAX_RETRIES": 5,
+        # Backoff before retry n is uniformly drawn from [0, BASE * 2**n],
+        # capped at BACKOFF_MAX seconds.
+        "BACKOFF_BASE": 0.5,
+        "BACKOFF_MAX": 30.0,
+        "INITIAL_CONCURRENCY": 4,
+        "MIN_CONCURRENCY": 1,
+        "MAX_CONCURRENCY": 32,
+    }
+
+    def __init__(self, client: Any, stats: "SyncStats | None" = None) -> None:
+        self.client = client
+        self.stats = stats
+        self.resources: dict[str, ApiResource] = {}
+        self.options = {
+            **self.DEFAULT_OPTIONS,
+            **getattr(settings, "DJRAZORPAY_API", {}),
+        }
+        rate = self.options["RATE"]
+        self.bucket = TokenBucket(rate, self.options["BURST"]) if rate else None
+        self.concurrency = AdaptiveConcurrency(
+            self.options["INITIAL_CONCURRENCY"],
+            self.options["MIN_CONCURRENCY"],
+            self.options["MAX_CONCURRENCY"],
+        )
+        self.local = threading.local()
+        session = getattr(client, "session", None)
+        if isinstance(session, requests.Session):
+            # razorpay.Client raises without the response; keep the last one of
+            # each thread to read its status code and Retry-After header.
+            session.hooks["response"].append(self.remember_response)
+
+    def __getattr__(self, name: str) -> ApiResource:
+        if name not in self.resources:
+            self.resources[name] = ApiResource(getattr(self.client, name), self)
+        return self.resources[name]
+
+    def remember_response(self, response: requests.Response, *args, **kwargs):
+        self.local.response = response
+
+    def call(self, method: Callable[..., dict], *args: Any, **kwargs: Any) -> dict:
+        for attempt in itertools.count():
+            self.local.response = None
+            if self.bucket is not None:
+                self.bucket.acquire()
+            with self.concurrency.slot():
+                start = time.perf_counter()
+                try:
+                    response = method(*args, **kwargs)
+                except Exception as exc:
+                    self.record(start, failed=True)
+                    throttled = self.is_throttled(exc)
+                    if throttled:
+                        self.concurrency.throttled()
+                    if attempt >= self.options["MAX_RETRIES"] or not (
+                        throttled or self.is_retryable(exc)
+                    ):
+                        raise
+                else:
+                    self.record(start, failed=False)
+                    self.concurrency.succeeded()
+                    return response
+            if self.stats is not None:
+                self.stats.record_api_retry()
+            time.sleep(self.backoff(attempt))
+
+    def record(self, start: float, failed: bool) -> None:
+        if self.stats is not None:
+            self.stats.record_api_call(time.perf_counter() - start, failed)
+
+    def status_code(self) -> int | None:
+        response = getattr(self.local, "response", None)
+        return response.status_code if response is not None else None
+
+    def is_throttled(self, exc: Exception) -> bool:
+        return self.status_code() == 429
+
+    def is_retryable(self, exc: Exception) -> bool:
+        status = self.status_code()
+        if status is not None:
+            return status >= 500
+        return isinstance(
+            exc,
+            (
+                razorpay.errors.ServerError,
+                requests.ConnectionError,
+                requests.Timeout,
+            ),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        delay = retry_after(getattr(self.local, "response", None))
+        if delay is None:
+            delay = random.uniform(0, self.options["BACKOFF_BASE"] * 2**attempt)
+        return min(delay, self.options["BACKOFF_MAX"])
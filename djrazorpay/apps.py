@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class DjrazorpayConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'djrazorpay'
+
+    def ready(self):
+        from djrazorpay.notes import create_note_indexes
+
+        post_migrate.connect(create_note_indexes, sender=self)
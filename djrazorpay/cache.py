@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+
+MISSING = object()
+
+
+class LRUCache:
+    """A thread-safe, size-bounded LRU mapping whose entries expire after ``ttl``."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys: Iterable[Hashable]) -> None:
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache:
+    """
+    Values looked up in a per-process ``LRUCache``, then in a Django cache,
+    then computed. Invalidation clears both tiers, but only in the calling
+    process; other processes may serve their local copy for up to
+    ``local_ttl`` seconds.
+
+    Sizes and timeouts are read from the ``DJRAZORPAY_<NAME>_CACHE`` setting,
+    a dict with the optional keys ``ALIAS`` (Django cache alias, default
+    ``"default"``), ``TIMEOUT`` (seconds in the Django cache, default 300),
+    ``LOCAL_TTL`` (default 5) and ``LOCAL_SIZE`` (default 10000).
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.prefix = f"djrazorpay:{name.lower()}:"
+        self._local: LRUCache | None = None
+
+    @property
+    def options(self) -> dict[str, Any]:
+        return getattr(settings, f"DJRAZORPAY_{self.name.upper()}_CACHE", {})
+
+    @property
+    def local(self) -> LRUCache:
+        if self._local is None:
+            self._local = LRUCache(
+                self.options.get("LOCAL_SIZE", 10000),
+                self.options.get("LOCAL_TTL", 5),
+            )
+        return self._local
+
+    @property
+    def shared(self):
+        return caches[self.options.get("ALIAS", "default")]
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.local.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(self.prefix + key, MISSING)
+        if value is MISSING:
+            value = compute()
+            self.shared.set(self.prefix + key, value, self.options.get("TIMEOUT", 300))
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        self.local.delete_many(keys)
+        self.shared.delete_many([self.prefix + key for key in keys])
+
+    def clear_local(self) -> None:
+        self.local.clear()
+
+
+# Plan IDs each customer is entitled to, keyed by customer ID.
+entitlement_cache = TieredCache("entitlement")
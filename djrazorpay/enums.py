@@ -32,3 +32,61 @@ class PlanPeriod(RazorpayStrEnum):
     MONTHLY = "monthly"
     QUARTERLY = "quarterly"
     YEARLY = "yearly"
+
+
+class OrderStatus(RazorpayStrEnum):
+    """Ref: https://razorpay.com/docs/payments/orders/#order-states"""
+
+    CREATED = "created"
+    ATTEMPTED = "attempted"
+    PAID = "paid"
+
+
+class PaymentStatus(RazorpayStrEnum):
+    """Ref: https://razorpay.com/docs/payments/payments/#payment-life-cycle"""
+
+    CREATED = "created"
+    AUTHORIZED = "authorized"
+    CAPTURED = "captured"
+    REFUNDED = "refunded"
+    FAILED = "failed"
+
+
+class InvoiceStatus(RazorpayStrEnum):
+    """Ref: https://razorpay.com/docs/payments/invoices/states/"""
+
+    DRAFT = "draft"
+    ISSUED = "issued"
+    PARTIALLY_PAID = "partially_paid"
+    PAID = "paid"
+    CANCELLED = "cancelled"
+    EXPIRED = "expired"
+    DELETED = "deleted"
+
+
+class SyncEntity(RazorpayStrEnum):
+    """Razorpay entity types synced by ``djrazorpay_sync_models``."""
+
+    PLAN = "plan"
+    CUSTOMER = "customer"
+    SUBSCRIPTION = "subscription"
+    ORDER = "order"
+    PAYMENT = "payment"
+    INVOICE = "invoice"
+
+
+class DriftKind(RazorpayStrEnum):
+    """How a stored row differs from Razorpay, as reported by reconciliation."""
+
+    MISSING = "missing"
+    EXTRA = "extra"
+    MISMATCH = "mismatch"
+
+
+# Entity types are synced stage by stage, so that the references of each
+# stage resolve against the rows of the previous ones.
+SYNC_STAGES = (
+    (SyncEntity.PLAN, SyncEntity.CUSTOMER),
+    (SyncEntity.SUBSCRIPTION, SyncEntity.ORDER),
+    (SyncEntity.PAYMENT, SyncEntity.INVOICE),
+)
@@ -54,3 +54,13 @@ class RazorpayDateTimeField(models.DateTimeField):
                 code="invalid_datetime",
                 params={"value": value},
             )
+
+
+class RazorpayFingerprintField(models.CharField):
+    description = "Digest of the Razorpay payload a row was last written from"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["max_length"] = 32
+        kwargs.setdefault("null", True)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
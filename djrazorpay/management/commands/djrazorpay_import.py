@@ -0,0 +1,66 @@
+from itertools import groupby
+from operator import itemgetter
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+
+from djrazorpay.enums import SyncEntity
+from djrazorpay.models import Account
+from djrazorpay.snapshot import iter_snapshot, open_snapshot
+from djrazorpay.stats import SyncStats
+from djrazorpay.sync import EntityWriter
+from djrazorpay.utils import chunked
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads an NDJSON snapshot written by djrazorpay_export, or any file of "
+        "Razorpay payloads, with batched upserts."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", help="Snapshot file to read.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of entities written per transaction "
+            f"(default: {DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--account",
+            metavar="NAME",
+            help="Link the imported rows to the Account of this name.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        account = None
+        if options["account"]:
+            account = Account.objects.filter(name=options["account"]).first()
+            if account is None:
+                raise CommandError(f"Account {options['account']!r} does not exist.")
+        stats = SyncStats()
+        writer = EntityWriter(stderr=self.stderr, stats=stats, account=account)
+        try:
+            with stats.count_queries(connection), open_snapshot(
+                options["path"], "r"
+            ) as fp:
+                for entity, payloads in groupby(iter_snapshot(fp), itemgetter(0)):
+                    for batch in chunked(payloads, options["batch_size"]):
+                        writer.write(entity, [data for _, data in batch])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        finally:
+            stats.finish()
+        for entity, rows in stats.rows.items():
+            self.stdout.write(
+                f"{SyncEntity(entity).value}: {sum(rows.values())} rows "
+                f"(inserted {rows['inserted']}, updated {rows['updated']}, "
+                f"unchanged {rows['unchanged']})"
+            )
+        self.stdout.write(f"Imported in {stats.elapsed:.1f}s")
@@ -0,0 +1,26 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import DEFAULT_DB_ALIAS
+
+from djrazorpay.notes import indexed_notes_keys, reindex_notes, uses_note_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Indexes stored notes under DJRAZORPAY_INDEXED_NOTES_KEYS: creates the "
+        "expression indexes on PostgreSQL, rebuilds the IndexedNote table "
+        "elsewhere."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args: Any, **options: Any) -> str | None:
+        using = options["database"]
+        keys = ", ".join(indexed_notes_keys()) or "no keys"
+        indexed = reindex_notes(using)
+        if uses_note_table(using):
+            self.stdout.write(f"Indexed notes of {indexed} rows ({keys})")
+        else:
+            self.stdout.write(f"Created missing note indexes ({keys})")
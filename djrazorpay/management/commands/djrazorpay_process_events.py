@@ -0,0 +1,175 @@
+import json
+import os
+from datetime import datetime
+from typing import Any
+
+import razorpay
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import InterfaceError, OperationalError, transaction
+from django.utils import timezone
+
+from djrazorpay.api import ApiClient
+from djrazorpay.enums import SyncEntity
+from djrazorpay.models import WebhookEvent
+from djrazorpay.sync import EntityWriter
+from djrazorpay.utils import from_timestamp
+
+DEFAULT_BATCH_SIZE = 500
+
+# An entity payload with its event and the time the event was created.
+EventItem = tuple[WebhookEvent, datetime, dict]
+
+
+class Command(BaseCommand):
+    client_class = razorpay.Client
+    help = "Applies stored Razorpay webhook events to the database."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "api_key",
+            type=str,
+            nargs="?",
+            default=os.environ.get("RAZORPAY_API_KEY"),
+            help="Used to fetch plans referenced by events but missing locally.",
+        )
+        parser.add_argument(
+            "secret_key",
+            type=str,
+            nargs="?",
+            default=os.environ.get("RAZORPAY_SECRET_KEY"),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Number of events applied per transaction (default: {DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Apply the events that failed before again.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        rzp = None
+        if options["api_key"] and options["secret_key"]:
+            rzp = ApiClient(
+                self.client_class(auth=(options["api_key"], options["secret_key"]))
+            )
+        self.entity_writer = EntityWriter(
+            rzp, self.stdout if options["verbosity"] >= 2 else None, self.stderr
+        )
+
+        if options["retry_failed"]:
+            WebhookEvent.objects.filter(failed_at__isnull=False).update(failed_at=None)
+        processed = 0
+        while count := self.process_batch(options["batch_size"]):
+            processed += count
+        self.stdout.write(f"Processed {processed} events")
+
+    def process_batch(self, batch_size: int) -> int:
+        """
+        Apply the oldest ``batch_size`` pending events in one transaction and
+        return how many there were. Rows are locked with SKIP LOCKED where the
+        database supports it, so several processes can drain concurrently.
+
+        Events are applied in the order Razorpay created them, and their
+        ``created_at`` is passed on so that the writer skips entities whose
+        stored state is newer. Events that cannot be applied are marked failed
+        with their error instead of rolling back the batch, so they do not hold
+        up the events queued behind them.
+        """
+        with transaction.atomic():
+            events = list(
+                WebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed_at=None, failed_at=None)
+                .order_by("received_at", "id")[:batch_size]
+            )
+            if not events:
+                return 0
+            failed: dict[str, str] = {}
+            parsed = []
+            for event in events:
+                try:
+                    body = json.loads(event.body)
+                    created_at = body.get("created_at")
+                    observed_at = (
+                        event.received_at
+                        if created_at is None
+                        else from_timestamp(created_at)
+                    )
+                    items = [
+                        (entity, body["payload"][entity.value]["entity"])
+                        for entity in SyncEntity
+                        if entity.value in body["payload"]
+                    ]
+                except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                    failed[event.pk] = f"Malformed event: {exc!r}"
+                    continue
+                parsed.append((observed_at, event, items))
+            entities: dict[SyncEntity, list[EventItem]] = {
+                entity: [] for entity in SyncEntity
+            }
+            for observed_at, event, items in sorted(
+                parsed, key=lambda parsed_event: parsed_event[0]
+            ):
+                for entity, data in items:
+                    entities[entity].append((event, observed_at, data))
+            # Plans and customers first, so subscriptions can reference them.
+            for entity, items in entities.items():
+                items = [item for item in items if item[0].pk not in failed]
+                if items:
+                    self.write_events(entity, items, failed)
+
+            now = timezone.now()
+            WebhookEvent.objects.filter(
+                pk__in=[event.pk for event in events if event.pk not in failed]
+            ).update(processed_at=now)
+            for event_id, error in failed.items():
+                self.stderr.write(f"Event {event_id} failed: {error}")
+                WebhookEvent.objects.filter(pk=event_id).update(
+                    failed_at=now, last_error=error
+                )
+        return len(events)
+
+    def write_events(
+        self,
+        entity: SyncEntity,
+        items: list[EventItem],
+        failed: dict[str, str],
+    ) -> None:
+        """
+        Write the ``entity`` payloads of ``items`` in a savepoint. If that
+        fails, write them one event at a time and add the events that still
+        fail to ``failed``, as well as those whose entity the writer skipped.
+        """
+        try:
+            with transaction.atomic():
+                skipped = self.entity_writer.write(
+                    entity,
+                    [data for _, _, data in items],
+                    [observed_at for _, observed_at, _ in items],
+                )
+        except (OperationalError, InterfaceError):
+            # Lost connections and lock timeouts are not the event's fault.
+            raise
+        except Exception:
+            # Find the events at fault by writing them one at a time.
+            skipped = {}
+            for event, observed_at, data in items:
+                if event.pk in failed:
+                    continue
+                try:
+                    with transaction.atomic():
+                        skipped.update(
+                            self.entity_writer.write(entity, [data], [observed_at])
+                        )
+                except (OperationalError, InterfaceError):
+                    raise
+                except Exception as exc:
+                    failed[event.pk] = f"{entity.value}: {exc!r}"
+        for event, _, data in items:
+            if data["id"] in skipped and event.pk not in failed:
+                failed[event.pk] = f"{entity.value} {data['id']}: {skipped[data['id']]}"
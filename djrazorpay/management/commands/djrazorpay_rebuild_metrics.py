@@ -0,0 +1,30 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from djrazorpay.metrics import rebuild_metrics
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the SubscriptionMetrics summary from the stored "
+        "subscriptions. Run it after migrating to it or changing plan prices, "
+        "while no sync is running."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Number of rows read or written at a time "
+            f"(default: {DEFAULT_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive integer.")
+        rows = rebuild_metrics(options["chunk_size"])
+        self.stdout.write(f"Rebuilt {rows} subscription metrics rows")
@@ -0,0 +1,108 @@
+import os
+import time
+from collections import Counter
+from collections.abc import Iterator
+from itertools import chain
+from typing import Any
+
+import razorpay
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from djrazorpay.api import ApiClient, iter_entities
+from djrazorpay.enums import SYNC_STAGES, DriftKind, SyncEntity
+from djrazorpay.models import ENTITY_MODELS, Account
+from djrazorpay.reconcile import Drift, diff
+from djrazorpay.utils import from_timestamp
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    client_class = razorpay.Client
+    help = (
+        "Compares the database with Razorpay without writing anything, "
+        "reporting missing, extra and mismatched entities."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "api_key", type=str, nargs="?", default=os.environ.get("RAZORPAY_API_KEY")
+        )
+        parser.add_argument(
+            "secret_key",
+            type=str,
+            nargs="?",
+            default=os.environ.get("RAZORPAY_SECRET_KEY"),
+        )
+        parser.add_argument(
+            "--entities",
+            nargs="+",
+            choices=[entity.value for entity in SyncEntity],
+            metavar="ENTITY",
+            help="Entity types to compare (default: all of "
+            f"{', '.join(entity.value for entity in SyncEntity)}).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Number of rows read from the database at a time "
+            f"(default: {DEFAULT_CHUNK_SIZE}).",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Exit with a non-zero status if any differences are found.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:
+        api_key: str | None = options["api_key"]
+        secret_key: str | None = options["secret_key"]
+        if not api_key or not secret_key:
+            raise CommandError("Please specify Razorpay secrets correctly.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive integer.")
+        entities = [SyncEntity(entity) for entity in options["entities"] or SyncEntity]
+        self.chunk_size: int = options["chunk_size"]
+        self.account = Account.objects.filter(api_key=api_key).first()
+        self.rzp = ApiClient(self.client_class(auth=(api_key, secret_key)))
+        # Entities created while the command runs are left out on both sides.
+        self.until = int(time.time())
+
+        drifts = 0
+        for entity in chain.from_iterable(SYNC_STAGES):
+            if entity not in entities:
+                continue
+            counts = Counter()
+            for drift in self.reconcile(entity, counts):
+                self.stdout.write(self.describe(entity, drift))
+            drifts += sum(counts[kind] for kind in DriftKind)
+            self.stdout.write(
+                f"{entity.value}: {counts['compared']} compared, "
+                f"{counts[DriftKind.MISSING]} missing, "
+                f"{counts[DriftKind.EXTRA]} extra, "
+                f"{counts[DriftKind.MISMATCH]} mismatched"
+            )
+        if options["check"] and drifts:
+            raise CommandError(f"Found {drifts} differences with Razorpay.")
+
+    def reconcile(self, entity: SyncEntity, counts: Counter) -> Iterator[Drift]:
+        """Stream the differences of ``entity`` under this account."""
+        model = ENTITY_MODELS[entity]
+        remote = iter_entities(getattr(self.rzp, entity.value), to=self.until)
+        stored = model.objects.filter(
+            account=self.account, created_at__lte=from_timestamp(self.until)
+        ).order_by("-created_at", "-pk")
+        if entity == SyncEntity.PLAN:
+            # Plan payloads embed their item, which is compared too.
+            stored = stored.select_related("item")
+        return diff(model, remote, stored.iterator(chunk_size=self.chunk_size), counts)
+
+    def describe(self, entity: SyncEntity, drift: Drift) -> str:
+        line = f"{drift.kind.value} {entity.value} {drift.entity_id}"
+        if drift.fields:
+            line += ": " + ", ".join(
+                f"{name} {stored!r} != {remote!r}"
+                for name, (stored, remote) in drift.fields.items()
+            )
+        return line
@@ -1,120 +1,490 @@
+import datetime
+import json
+import multiprocessing
 import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import chain
 from typing import Any
 
 import razorpay
 from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, connections, transaction
 
-from djrazorpay.models import Customer, Plan, PlanItem, Subscription
+from djrazorpay.api import ApiClient, iter_pages, iter_pages_concurrently
+from djrazorpay.enums import SYNC_STAGES, SyncEntity
+from djrazorpay.models import Account, SyncCheckpoint, SyncCursor
+from djrazorpay.signals import sync_batch_written, sync_finished, sync_started
+from djrazorpay.stats import SyncStats
+from djrazorpay.sync import EntityWriter
+from djrazorpay.utils import chunked, from_timestamp
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PROGRESS_INTERVAL = 10.0
+
+# The command running in a worker process of --processes.
+worker_command: "Command | None" = None
+
+
+class TimeBudgetExceeded(Exception):
+    """Raised between batches once the ``--time-budget`` is used up."""
+
+
+def init_worker(command: "Command") -> None:
+    global worker_command
+    worker_command = command
+
+
+def sync_account_in_worker(account_pk: int) -> dict:
+    account = Account.objects.get(pk=account_pk)
+    stats = SyncStats()
+    worker_command.sync_account(account.api_key, account.secret_key, account, stats)
+    return stats.as_dict()
 
 
 class Command(BaseCommand):
+    client_class = razorpay.Client
     help = "Syncs the database with the latest Razorpay data."
 
     def add_arguments(self, parser: CommandParser) -> None:
-        parser.add_argument("api_key", type=str)
-        parser.add_argument("secret_key", type=str)
+        parser.add_argument(
+            "api_key",
+            type=str,
+            nargs="?",
+            help="Razorpay API key (default: $RAZORPAY_API_KEY).",
+        )
+        parser.add_argument(
+            "secret_key",
+            type=str,
+            nargs="?",
+            help="Razorpay secret key (default: $RAZORPAY_SECRET_KEY).",
+        )
+        parser.add_argument(
+            "--all-accounts",
+            action="store_true",
+            help="Sync every active Account instead of the given keys.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="With --all-accounts, number of worker processes syncing "
+            "accounts in parallel (default: 1, one account after another).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of entities written per transaction "
+            f"(default: {DEFAULT_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of threads fetching pages from Razorpay while a single "
+            "thread writes them to the database (default: 1, fully serial).",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only fetch entities created since the last sync.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Fetch every entity, even when --incremental is given.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue the previous run from its last checkpoint if it did "
+            "not finish, instead of starting over.",
+        )
+        parser.add_argument(
+            "--entities",
+            nargs="+",
+            choices=[entity.value for entity in SyncEntity],
+            metavar="ENTITY",
+            help="Entity types to sync (default: all of "
+            f"{', '.join(entity.value for entity in SyncEntity)}).",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            metavar="SECONDS",
+            help="Stop after the batch that uses up SECONDS, keeping the "
+            "checkpoints so that --resume continues from there.",
+        )
+        parser.add_argument(
+            "--stats-json",
+            metavar="PATH",
+            help="Write timings, API/query counts and row counts of the run "
+            "to PATH as JSON.",
+        )
+        parser.add_argument(
+            "--progress-interval",
+            type=float,
+            default=DEFAULT_PROGRESS_INTERVAL,
+            help="Seconds between progress lines "
+            f"(default: {DEFAULT_PROGRESS_INTERVAL:g}). Per-entity lines are "
+            "only written with --verbosity 2 or higher.",
+        )
 
     def handle(self, *args: Any, **options: Any) -> str | None:
-        api_key: str | None = options.get("api_key", os.environ.get("RAZORPAY_API_KEY"))
-        secret_key: str | None = options.get(
-            "secret_key", os.environ.get("RAZORPAY_SECRET_KEY")
-        )
-        if not api_key or not secret_key:
-            raise CommandError("Please specify Razorpay secrets correctly.")
-
-        rzp = razorpay.Client(auth=(api_key, secret_key))
-
-        self.sync_plans(rzp)
-        self.sync_customers(rzp)
-        self.sync_subscriptions(rzp)
-
-    def sync_plans(self, rzp):
-        plans = rzp.plan.all()
-        for plan_data in plans["items"]:
-            item_data = plan_data.pop("item")
-            self.stdout.write(f"Sync plan {item_data['id']}")
-            item, _ = PlanItem.objects.update_or_create(
-                id=item_data["id"],
-                defaults={
-                    "active": item_data["active"],
-                    "name": item_data["name"],
-                    "description": item_data["description"],
-                    "amount": item_data["amount"] / 100,
-                    "unit_amount": item_data["unit_amount"] / 100,
-                    "currency": item_data["currency"],
-                    "type": item_data["type"],
-                    "unit": item_data["unit"],
-                    "tax_inclusive": item_data["tax_inclusive"],
-                    "hsn_code": item_data["hsn_code"],
-                    "sac_code": item_data["sac_code"],
-                    "tax_rate": item_data["tax_rate"],
-                    "tax_id": item_data["tax_id"],
-                    "tax_group_id": item_data["tax_group_id"],
-                    "created_at": item_data["created_at"],
-                    "updated_at": item_data["updated_at"],
-                },
-            )
-            Plan.objects.update_or_create(
-                id=plan_data["id"],
-                defaults={
-                    "interval": plan_data["interval"],
-                    "period": plan_data["period"],
-                    "item": item,
-                    "created_at": plan_data["created_at"],
-                    # "notes": plan_data.get("notes", {}),
-                },
-            )
+        api_key: str | None = options["api_key"]
+        secret_key: str | None = options["secret_key"]
+        if options["all_accounts"]:
+            if api_key:
+                raise CommandError("Do not pass keys together with --all-accounts.")
+        else:
+            api_key = api_key or os.environ.get("RAZORPAY_API_KEY")
+            secret_key = secret_key or os.environ.get("RAZORPAY_SECRET_KEY")
+            if not api_key or not secret_key:
+                raise CommandError("Please specify Razorpay secrets correctly.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be a positive integer.")
+        if options["processes"] < 1:
+            raise CommandError("--processes must be a positive integer.")
+        if options["time_budget"] is not None and options["time_budget"] < 0:
+            raise CommandError("--time-budget must not be negative.")
+        self.batch_size: int = options["batch_size"]
+        self.workers: int = options["workers"]
+        self.verbosity: int = options["verbosity"]
+        self.incremental: bool = options["incremental"] and not options["full"]
+        self.resume: bool = options["resume"]
+        self.progress_interval: float = options["progress_interval"]
+        self.entities: list[SyncEntity] = [
+            SyncEntity(entity) for entity in options["entities"] or SyncEntity
+        ]
+        self.deadline: float | None = (
+            None
+            if options["time_budget"] is None
+            else time.monotonic() + options["time_budget"]
+        )
+
+        self.total_stats = SyncStats()
+        self.account_stats: dict[str, dict] = {}
+        try:
+            if options["all_accounts"]:
+                self.sync_accounts(options["processes"])
+            else:
+                account = Account.objects.filter(api_key=api_key).first()
+                self.sync_account(api_key, secret_key, account, self.total_stats)
+        finally:
+            self.total_stats.finish()
+            if options["stats_json"]:
+                data = self.total_stats.as_dict()
+                if options["all_accounts"]:
+                    data["accounts"] = self.account_stats
+                with open(options["stats_json"], "w") as fp:
+                    json.dump(data, fp, indent=2)
+        self.stdout.write(self.summary(self.total_stats.as_dict()))
 
-    def sync_customers(self, rzp):
-        customers = rzp.customer.all()
-        for customer_data in customers["items"]:
-            self.stdout.write(f"Sync customer {customer_data['id']}")
-            Customer.objects.update_or_create(
-                id=customer_data["id"],
-                defaults={
-                    "name": customer_data["name"],
-                    "email": customer_data["email"],
-                    "contact": customer_data["contact"],
-                    "gstin": customer_data["gstin"],
-                    "created_at": customer_data["created_at"],
-                    # "notes": customer_data.get("notes", {}),
-                },
+    def summary(self, data: dict) -> str:
+        rows = sum(sum(counts.values()) for counts in data["rows"].values())
+        return (
+            f"Synced {rows} rows in {data['seconds']:.1f}s "
+            f"({data['api_calls']} API calls, {data['queries']} queries)"
+        )
+
+    def sync_accounts(self, processes: int) -> None:
+        """
+        Sync every active account, on ``processes`` forked worker processes if
+        more than one, adding their stats to ``self.total_stats``. A failing
+        account does not stop the others; the command fails once all are done.
+        """
+        accounts = list(Account.objects.filter(active=True).order_by("name"))
+        failed = []
+
+        def done(account: Account, data: dict | None, exc: Exception | None) -> None:
+            if exc is not None:
+                failed.append(account.name)
+                self.stderr.write(f"{account.name}: sync failed: {exc!r}")
+                return
+            self.account_stats[account.name] = data
+            self.total_stats.add(data)
+            self.stdout.write(f"{account.name}: {self.summary(data)}")
+
+        if processes == 1:
+            for account in accounts:
+                stats = SyncStats()
+                try:
+                    self.sync_account(
+                        account.api_key, account.secret_key, account, stats
+                    )
+                except Exception as exc:
+                    done(account, None, exc)
+                else:
+                    done(account, stats.as_dict(), None)
+        else:
+            # Workers are forked so they inherit this command, client_class
+            # included, without pickling; each opens its own connections.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                min(processes, len(accounts) or 1),
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=init_worker,
+                initargs=(self,),
+            ) as pool:
+                futures = {
+                    pool.submit(sync_account_in_worker, account.pk): account
+                    for account in accounts
+                }
+                for future in as_completed(futures):
+                    try:
+                        data = future.result()
+                    except Exception as exc:
+                        done(futures[future], None, exc)
+                    else:
+                        done(futures[future], data, None)
+        if failed:
+            raise CommandError(f"Sync failed for accounts: {', '.join(failed)}")
+
+    def sync_account(
+        self,
+        api_key: str,
+        secret_key: str,
+        account: Account | None,
+        stats: SyncStats,
+    ) -> None:
+        """Sync one Razorpay account, recording the run in ``stats``."""
+        # Cursors and checkpoints belong to the account, or to the key itself
+        # if it has no account.
+        self.sync_state_filter: dict[str, Any] = (
+            {"account": account}
+            if account is not None
+            else {"account": None, "api_key": api_key}
+        )
+        self.load_checkpoints()
+        self.last_progress = time.monotonic()
+        self.stats = stats
+        self.rzp = ApiClient(self.client_class(auth=(api_key, secret_key)), stats)
+        self.entity_writer = EntityWriter(
+            self.rzp,
+            self.stdout if self.verbosity >= 2 else None,
+            self.stderr,
+            stats,
+            account,
+        )
+
+        sync_started.send(sender=self.__class__, stats=stats)
+        try:
+            with stats.count_queries(connection):
+                if self.workers > 1:
+                    self.sync_concurrently(self.workers)
+                else:
+                    for entity in chain.from_iterable(SYNC_STAGES):
+                        self.sync_entity(entity)
+        except TimeBudgetExceeded:
+            self.stdout.write(
+                "Time budget used up; run again with --resume to continue."
             )
+        else:
+            SyncCheckpoint.objects.filter(**self.sync_state_filter).delete()
+        finally:
+            stats.finish()
+            sync_finished.send(sender=self.__class__, stats=stats)
+
+    def load_checkpoints(self) -> None:
+        """
+        Load the checkpoints of the unfinished previous run with ``--resume``,
+        otherwise start a new run of ``self.entities``, replacing them. A
+        resumed run syncs the entity types of the previous one.
+        """
+        checkpoints = {
+            SyncEntity(checkpoint.entity): checkpoint
+            for checkpoint in SyncCheckpoint.objects.filter(**self.sync_state_filter)
+        }
+        if self.resume and checkpoints:
+            run_id = next(iter(checkpoints.values())).run_id
+            self.stdout.write(f"Resuming sync run {run_id}")
+            self.checkpoints = checkpoints
+            return
+        run_id = uuid.uuid4()
+        # Pin the upper bound so entities created while the sync runs are left
+        # for the next run rather than racing the cursor.
+        sync_until = int(time.time())
+        with transaction.atomic():
+            SyncCheckpoint.objects.filter(**self.sync_state_filter).delete()
+            self.checkpoints = {
+                entity: SyncCheckpoint.objects.create(
+                    run_id=run_id,
+                    **self.sync_state_filter,
+                    entity=entity,
+                    synced_from=self.synced_from(entity),
+                    synced_until=from_timestamp(sync_until),
+                )
+                for entity in self.entities
+            }
+
+    def report_progress(self, entity: SyncEntity, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last_progress < self.progress_interval:
+            return
+        self.last_progress = now
+        rows = self.stats.rows[entity]
+        total = sum(rows.values())
+        self.stdout.write(
+            f"{entity.value}: {total} rows (inserted {rows['inserted']}, "
+            f"updated {rows['updated']}, unchanged {rows['unchanged']}), "
+            f"{self.stats.total_rows() / self.stats.elapsed:.0f} rows/s overall"
+        )
+
+    def resource(self, entity: SyncEntity):
+        return getattr(self.rzp, entity.value)
+
+    def sync_concurrently(self, workers: int) -> None:
+        """
+        Fetch pages on ``workers`` threads while this thread writes them.
+
+        The entity types of each of ``SYNC_STAGES`` are fetched in parallel;
+        a stage starts once the previous one is written, so subscription
+        references to plans and customers resolve against the local tables.
+        Fetched pages go through a bounded queue, which keeps memory flat when
+        the API outpaces the database. All database access stays on this
+        thread.
+        """
+        pages: queue.Queue = queue.Queue(maxsize=workers * 2)
+        stop = threading.Event()
+        filters = {entity: self.list_filters(entity) for entity in self.checkpoints}
+        stages = iter(SYNC_STAGES)
+        running: set[SyncEntity] = set()
 
-    def sync_subscriptions(self, rzp):
-        subscriptions = rzp.subscription.all()
-        for subscription_data in subscriptions["items"]:
-            plan = Plan.objects.get(id=subscription_data["plan_id"])
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce(entity: SyncEntity) -> None:
             try:
-                customer = Customer.objects.get(id=subscription_data["customer_id"])
-            except Customer.DoesNotExist:
-                customer = None
-            self.stdout.write(f"Sync subscription {subscription_data['id']}")
-            Subscription.objects.update_or_create(
-                id=subscription_data["id"],
-                defaults={
-                    "plan": plan,
-                    "customer": customer,
-                    "status": subscription_data["status"],
-                    "current_start": subscription_data["current_start"],
-                    "current_end": subscription_data["current_end"],
-                    "ended_at": subscription_data["ended_at"],
-                    "quantity": subscription_data["quantity"],
-                    # "notes": subscription_data.get("notes", {}),
-                    "charge_at": subscription_data["charge_at"],
-                    "start_at": subscription_data["start_at"],
-                    "end_at": subscription_data["end_at"],
-                    "auth_attempts": subscription_data["auth_attempts"],
-                    "total_count": subscription_data["total_count"],
-                    "paid_count": subscription_data["paid_count"],
-                    "customer_notify": subscription_data["customer_notify"],
-                    "created_at": subscription_data["created_at"],
-                    "expire_by": subscription_data["expire_by"],
-                    "short_url": subscription_data["short_url"],
-                    "has_scheduled_changes": subscription_data["has_scheduled_changes"],
-                    "change_scheduled_at": subscription_data["change_scheduled_at"],
-                    "source": subscription_data["source"],
-                    "offer_id": subscription_data["offer_id"],
-                    "remaining_count": subscription_data["remaining_count"],
-                },
-            )
+                for page in iter_pages_concurrently(
+                    self.resource(entity), fetchers, workers, **filters[entity]
+                ):
+                    if not put((entity, page)):
+                        return
+            except BaseException as exc:
+                put((entity, exc))
+            else:
+                put((entity, None))
+
+        with (
+            ThreadPoolExecutor(
+                workers, thread_name_prefix="djrazorpay-fetch"
+            ) as fetchers,
+            ThreadPoolExecutor(
+                len(SyncEntity), thread_name_prefix="djrazorpay-stream"
+            ) as streams,
+        ):
+
+            def start_next_stage() -> None:
+                """Start the next stage with entity types left to sync."""
+                for stage in stages:
+                    for entity in stage:
+                        checkpoint = self.checkpoints.get(entity)
+                        if checkpoint is not None and not checkpoint.completed:
+                            running.add(entity)
+                            streams.submit(produce, entity)
+                    if running:
+                        return
+
+            try:
+                start_next_stage()
+                buffers: dict[SyncEntity, list[dict]] = {
+                    entity: [] for entity in SyncEntity
+                }
+                while running:
+                    with self.stats.timer("fetch"):
+                        entity, page = pages.get()
+                    if isinstance(page, BaseException):
+                        raise page
+                    if page is None:
+                        running.discard(entity)
+                        self.write_batch(entity, buffers[entity])
+                        self.report_progress(entity, force=True)
+                        self.save_cursor(entity)
+                        if not running:
+                            start_next_stage()
+                        continue
+                    buffer = buffers[entity]
+                    buffer.extend(page)
+                    while len(buffer) >= self.batch_size:
+                        self.write_batch(entity, buffer[: self.batch_size])
+                        del buffer[: self.batch_size]
+            finally:
+                stop.set()
+
+    def synced_from(self, entity: SyncEntity) -> datetime.datetime | None:
+        """The ``from`` filter of ``entity`` for a new run."""
+        if not self.incremental:
+            return None
+        cursor = SyncCursor.objects.filter(
+            **self.sync_state_filter, entity=entity
+        ).first()
+        # ``from`` is inclusive, so entities sharing the watermark's second are
+        # fetched again; the upsert makes that harmless.
+        return cursor.last_created_at if cursor is not None else None
+
+    def list_filters(self, entity: SyncEntity) -> dict[str, int]:
+        """Filters for the list endpoint of ``entity`` in this run."""
+        return self.checkpoints[entity].list_filters()
+
+    def sync_entity(self, entity: SyncEntity) -> None:
+        checkpoint = self.checkpoints.get(entity)
+        if checkpoint is None or checkpoint.completed:
+            return
+        pages = iter_pages(self.resource(entity), **self.list_filters(entity))
+        entities = chain.from_iterable(self.stats.timed(pages, "fetch"))
+        for batch in chunked(entities, self.batch_size):
+            self.write_batch(entity, batch)
+        self.report_progress(entity, force=True)
+        self.save_cursor(entity)
+
+    def write_batch(self, entity: SyncEntity, batch: list[dict]) -> None:
+        """
+        Write ``batch`` and advance the checkpoint of ``entity`` with it.
+
+        Raise ``TimeBudgetExceeded`` instead once the time budget is used up,
+        unless nothing was written yet: a resumed run fetches the oldest row
+        written again, so each run has to write a batch to make progress.
+        """
+        if not batch:
+            return
+        if (
+            self.deadline is not None
+            and time.monotonic() >= self.deadline
+            and self.stats.total_rows()
+        ):
+            raise TimeBudgetExceeded
+        with transaction.atomic():
+            self.entity_writer.write(entity, batch)
+            self.checkpoints[entity].advance(batch)
+        sync_batch_written.send(sender=self.__class__, entity=entity, stats=self.stats)
+        self.report_progress(entity)
+
+    def save_cursor(self, entity: SyncEntity) -> None:
+        """
+        Advance the cursor of ``entity`` once all of its entities are written,
+        and mark its checkpoint completed. Razorpay lists newest first, so the
+        watermark cannot be committed page by page without skipping older
+        entities after a failure.
+        """
+        checkpoint = self.checkpoints[entity]
+        with transaction.atomic():
+            if checkpoint.newest_created_at is not None:
+                SyncCursor.objects.update_or_create(
+                    **self.sync_state_filter,
+                    entity=entity,
+                    defaults={"last_created_at": checkpoint.newest_created_at},
+                )
+            checkpoint.completed = True
+            checkpoint.save(update_fields=["completed", "updated_at"])
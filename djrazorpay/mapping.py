@@ -0,0 +1,198 @@
+"""
+Declarative mapping of Razorpay API payloads onto models.
+
+Every concrete field of a ``RazorpayBaseModel`` is read from the payload key
+named after its attname (``plan_id`` for the ``plan`` foreign key), with
+``RazorpayDateTimeField`` values converted from Unix timestamps and
+``RazorpayFingerprintField`` set to a digest of the payload. Models list
+the exceptions in ``razorpay_fields``, keyed by field name::
+
+    razorpay_fields = {"amount": Amount(), "item": RazorpayField("item.id")}
+
+The mapping is compiled once per model into a converter that builds instances
+positionally, the way Django builds rows read from the database, so no field
+lookups or ``to_python`` dispatch happen per value. ``compile_serializer``
+inverts it, turning rows back into payloads.
+"""
+
+import datetime
+import functools
+import hashlib
+import json
+from collections.abc import Callable
+from decimal import Decimal
+from operator import itemgetter
+from typing import Any
+
+from django.db import models
+
+from djrazorpay.fields import RazorpayDateTimeField, RazorpayFingerprintField
+from djrazorpay.utils import from_timestamp
+
+
+class RazorpayField:
+    """
+    Reads one model field from a payload. ``key`` defaults to the attname of
+    the field and may be dotted to reach into nested objects. Missing keys are
+    an error unless the model field is nullable, in which case they read as
+    ``None``.
+    """
+
+    def __init__(self, key: str | None = None) -> None:
+        self.key = key
+
+    def convert(self, value: Any) -> Any:
+        return value
+
+    def unconvert(self, value: Any) -> Any:
+        """The payload value of a stored ``value``; the inverse of ``convert``."""
+        return value
+
+    def path(self, field: models.Field) -> list[str]:
+        return (self.key or field.attname).split(".")
+
+    def getter(self, field: models.Field) -> Callable[[dict], Any]:
+        path = self.path(field)
+        convert = None if type(self).convert is RazorpayField.convert else self.convert
+        if len(path) == 1 and convert is None and not field.null:
+            return itemgetter(path[0])
+        nullable = field.null
+
+        def get(data: dict) -> Any:
+            value: Any = data
+            for key in path:
+                value = (value or {}).get(key) if nullable else value[key]
+            return convert(value) if convert else value
+
+        return get
+
+
+class Amount(RazorpayField):
+    """An amount in the smallest currency unit (paise), stored in rupees."""
+
+    def convert(self, value: int | None) -> Decimal | None:
+        # Scaling the integer keeps the value exact, unlike dividing by 100.
+        return None if value is None else Decimal(value).scaleb(-2)
+
+    def unconvert(self, value: Decimal | None) -> int | None:
+        return None if value is None else int(value.scaleb(2))
+
+
+class Timestamp(RazorpayField):
+    """A Unix timestamp, stored as an aware UTC datetime."""
+
+    def convert(self, value: int | None) -> datetime.datetime | None:
+        return None if value is None else from_timestamp(value)
+
+    def unconvert(self, value: datetime.datetime | None) -> int | None:
+        return None if value is None else int(value.timestamp())
+
+
+class Notes(RazorpayField):
+    """
+    Free-form key-value notes. Razorpay serialises empty notes as ``[]``, so
+    those are stored as ``{}`` like any other notes.
+    """
+
+    def __init__(self, key: str | None = "notes") -> None:
+        super().__init__(key)
+
+    def convert(self, value: dict | list | None) -> dict:
+        return value or {}
+
+
+class Local(RazorpayField):
+    """A field set locally rather than read from the payload; starts as ``None``."""
+
+    def getter(self, field: models.Field) -> Callable[[dict], Any]:
+        return lambda data: None
+
+
+class Fingerprint(RazorpayField):
+    """A digest of the whole payload, to tell whether a row needs rewriting."""
+
+    def getter(self, field: models.Field) -> Callable[[dict], Any]:
+        return payload_fingerprint
+
+
+def payload_fingerprint(data: dict) -> str:
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def default_field(field: models.Field) -> RazorpayField:
+    if isinstance(field, RazorpayDateTimeField):
+        return Timestamp()
+    if isinstance(field, RazorpayFingerprintField):
+        return Fingerprint()
+    return RazorpayField()
+
+
+def field_specs(
+    model: type[models.Model],
+) -> list[tuple[models.Field, RazorpayField]]:
+    """
+    Pair each concrete field of ``model`` with how it is read, following the
+    ``razorpay_fields`` of ``model`` and its bases.
+    """
+    fields = model._meta.concrete_fields
+    spec: dict[str, RazorpayField] = {}
+    for cls in reversed(model.__mro__):
+        spec.update(cls.__dict__.get("razorpay_fields", {}))
+    unknown = set(spec) - {field.name for field in fields}
+    if unknown:
+        raise ValueError(
+            f"{model.__name__}.razorpay_fields names unknown fields: "
+            f"{', '.join(sorted(unknown))}"
+        )
+    return [(field, spec.get(field.name, default_field(field))) for field in fields]
+
+
+def payload_fields(model: type[models.Model]) -> list[models.Field]:
+    """The fields of ``model`` holding payload values, to compare with Razorpay."""
+    return [
+        field
+        for field, spec in field_specs(model)
+        if not isinstance(spec, (Local, Fingerprint))
+    ]
+
+
+@functools.cache
+def compile_converter(model: type[models.Model]) -> Callable[[dict], models.Model]:
+    """
+    Return a function building an unsaved ``model`` instance from a payload,
+    as described by ``field_specs``.
+    """
+    getters = tuple(spec.getter(field) for field, spec in field_specs(model))
+
+    def convert(data: dict) -> models.Model:
+        return model(*[get(data) for get in getters])
+
+    return convert
+
+
+@functools.cache
+def compile_serializer(model: type[models.Model]) -> Callable[[models.Model], dict]:
+    """
+    Return a function turning a ``model`` instance back into a payload that
+    ``compile_converter`` reads as the same instance. Local fields and the
+    fingerprint are left out; dotted keys become nested objects holding only
+    that key.
+    """
+    setters = []
+    for field, spec in field_specs(model):
+        if isinstance(spec, (Local, Fingerprint)):
+            continue
+        *parents, key = spec.path(field)
+        setters.append((field.attname, parents, key, spec.unconvert))
+
+    def serialize(obj: models.Model) -> dict:
+        data: dict = {}
+        for attname, parents, key, unconvert in setters:
+            target = data
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[key] = unconvert(getattr(obj, attname))
+        return data
+
+    return serialize
@@ -0,0 +1,184 @@
+"""
+Upkeep of ``SubscriptionMetrics``.
+
+Each written subscription whose plan, status or quantity changed moves its
+count and MRR from the metrics row of its old plan and status to that of the
+new ones, on the day the change was written. Deltas are applied in the
+transaction that writes the subscriptions, from stored values read with row
+locks, so concurrent writers of the same subscriptions take turns. Two writers
+inserting the same new subscription at once can both count it, though; run
+such writers one at a time or rebuild the metrics. Changing a plan's price
+does not touch the metrics; rebuild them afterwards.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from djrazorpay.enums import PlanPeriod, SubscriptionStatus
+from djrazorpay.models import Plan, Subscription, SubscriptionMetrics
+from djrazorpay.utils import chunked
+
+PERIODS_PER_YEAR = {
+    PlanPeriod.DAILY: 365,
+    PlanPeriod.WEEKLY: 52,
+    PlanPeriod.MONTHLY: 12,
+    PlanPeriod.QUARTERLY: 4,
+    PlanPeriod.YEARLY: 1,
+}
+CENT = Decimal("0.01")
+# Statuses a subscription ends in, on the day of its ``ended_at``.
+ENDED_STATUSES = (
+    SubscriptionStatus.CANCELLED,
+    SubscriptionStatus.COMPLETED,
+    SubscriptionStatus.EXPIRED,
+)
+
+# (day, plan_id, status) -> [count, mrr, entered]
+Deltas = dict[tuple, list]
+
+
+def monthly_amount(
+    amount: Decimal, period: str, interval: int, quantity: int
+) -> Decimal:
+    """The MRR of ``quantity`` units of a plan billing ``amount``."""
+    yearly = amount * quantity * PERIODS_PER_YEAR[PlanPeriod(period)]
+    return (yearly / (12 * interval)).quantize(CENT)
+
+
+def plan_prices(
+    plan_ids: Iterable[str] | None = None,
+) -> dict[str, tuple[Decimal, str, int]]:
+    """The item amount, period and interval of each of ``plan_ids`` (or all)."""
+    plans = (
+        Plan.objects.all()
+        if plan_ids is None
+        else Plan.objects.filter(pk__in=set(plan_ids))
+    )
+    return {
+        pk: (amount, period, interval)
+        for pk, amount, period, interval in plans.values_list(
+            "pk", "item__amount", "period", "interval"
+        )
+    }
+
+
+def record_subscription_changes(
+    changes: Iterable[tuple[Subscription, dict | None]],
+) -> None:
+    """
+    Apply the metrics deltas of ``changes``, as returned by
+    ``EntityWriter.upsert`` with ``Subscription.metrics_fields`` tracked.
+    """
+    moves = []
+    for subscription, stored in changes:
+        new = (subscription.plan_id, subscription.status, subscription.quantity)
+        old = stored and (stored["plan_id"], stored["status"], stored["quantity"])
+        if old != new:
+            moves.append((old, new))
+    if not moves:
+        return
+    prices = plan_prices(
+        state[0] for move in moves for state in move if state is not None
+    )
+    day = timezone.now().date()
+    deltas: Deltas = defaultdict(lambda: [0, Decimal(0), 0])
+    for old, new in moves:
+        if old is not None:
+            plan_id, status, quantity = old
+            delta = deltas[day, plan_id, status]
+            delta[0] -= 1
+            delta[1] -= monthly_amount(*prices[plan_id], quantity)
+        plan_id, status, quantity = new
+        delta = deltas[day, plan_id, status]
+        delta[0] += 1
+        delta[1] += monthly_amount(*prices[plan_id], quantity)
+        if old is None or old[:2] != new[:2]:
+            delta[2] += 1
+    apply_deltas(deltas)
+
+
+def apply_deltas(deltas: Deltas) -> None:
+    """Add ``deltas`` to their metrics rows, creating the missing ones."""
+    with transaction.atomic():
+        for (day, plan_id, status), (count, mrr, entered) in deltas.items():
+            if not (count or mrr or entered):
+                continue
+            row = SubscriptionMetrics.objects.filter(
+                day=day, plan_id=plan_id, status=status
+            )
+            updates = {
+                "count": F("count") + count,
+                "mrr": F("mrr") + mrr,
+                "entered": F("entered") + entered,
+            }
+            if row.update(**updates):
+                continue
+            try:
+                with transaction.atomic():
+                    SubscriptionMetrics.objects.create(
+                        day=day,
+                        plan_id=plan_id,
+                        status=status,
+                        count=count,
+                        mrr=mrr,
+                        entered=entered,
+                    )
+            except IntegrityError:
+                # Created concurrently since the update.
+                row.update(**updates)
+
+
+def rebuild_metrics(chunk_size: int = 2000) -> int:
+    """
+    Replace the metrics with those reconstructed from the stored
+    subscriptions, and return the number of metrics rows. Only the current
+    state of a subscription is stored: one that ended counts as active from
+    the day it was created and as entering its final status on the day it
+    ended; any other counts as entering its current status on the day it was
+    created. Subscriptions written while this runs may be left out, so run it
+    while no sync is.
+    """
+    prices = plan_prices()
+    deltas: Deltas = defaultdict(lambda: [0, Decimal(0), 0])
+    subscriptions = Subscription.objects.values_list(
+        "created_at", "ended_at", "plan_id", "status", "quantity"
+    )
+    for created_at, ended_at, plan_id, status, quantity in subscriptions.iterator(
+        chunk_size=chunk_size
+    ):
+        mrr = monthly_amount(*prices[plan_id], quantity)
+        entered_on = created_at
+        if status in ENDED_STATUSES and ended_at is not None:
+            delta = deltas[created_at.date(), plan_id, SubscriptionStatus.ACTIVE]
+            delta[0] += 1
+            delta[1] += mrr
+            delta[2] += 1
+            delta = deltas[ended_at.date(), plan_id, SubscriptionStatus.ACTIVE]
+            delta[0] -= 1
+            delta[1] -= mrr
+            entered_on = ended_at
+        delta = deltas[entered_on.date(), plan_id, status]
+        delta[0] += 1
+        delta[1] += mrr
+        delta[2] += 1
+    rows = (
+        SubscriptionMetrics(
+            day=day,
+            plan_id=plan_id,
+            status=status,
+            count=count,
+            mrr=mrr,
+            entered=entered,
+        )
+        for (day, plan_id, status), (count, mrr, entered) in deltas.items()
+    )
+    with transaction.atomic():
+        SubscriptionMetrics.objects.all().delete()
+        for batch in chunked(rows, chunk_size):
+            SubscriptionMetrics.objects.bulk_create(batch)
+    return len(deltas)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:20
+
+import djrazorpay.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djrazorpay', '0002_alter_customer_created_at_alter_plan_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(help_text='Razorpay API key the cursor belongs to.', max_length=64)),
+                ('entity', models.CharField(choices=[('plan', 'PLAN'), ('customer', 'CUSTOMER'), ('subscription', 'SUBSCRIPTION')], max_length=16)),
+                ('last_created_at', djrazorpay.fields.RazorpayDateTimeField(help_text='Creation time of the newest entity synced so far.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'entity'), name='djrazorpay_synccursor_unique')],
+            },
+        ),
+    ]
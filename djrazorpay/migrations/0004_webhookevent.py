@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:23
+
+import djrazorpay.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0003_synccursor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookEvent",
+            fields=[
+                (
+                    "id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        max_length=64, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "body",
+                    models.TextField(
+                        help_text="Raw request body as signed by Razorpay."
+                    ),
+                ),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["processed_at", "received_at"],
+                        name="djrazorpay_webhook_pending",
+                    )
+                ],
+            },
+        ),
+    ]
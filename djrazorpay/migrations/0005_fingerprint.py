@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:37
+
+import djrazorpay.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0004_webhookevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="fingerprint",
+            field=djrazorpay.fields.RazorpayFingerprintField(
+                editable=False,
+                help_text="Digest of the payload the row was last written from; rows whose payload did not change are not rewritten on sync.",
+                max_length=32,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="plan",
+            name="fingerprint",
+            field=djrazorpay.fields.RazorpayFingerprintField(
+                editable=False,
+                help_text="Digest of the payload the row was last written from; rows whose payload did not change are not rewritten on sync.",
+                max_length=32,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="planitem",
+            name="fingerprint",
+            field=djrazorpay.fields.RazorpayFingerprintField(
+                editable=False,
+                help_text="Digest of the payload the row was last written from; rows whose payload did not change are not rewritten on sync.",
+                max_length=32,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="fingerprint",
+            field=djrazorpay.fields.RazorpayFingerprintField(
+                editable=False,
+                help_text="Digest of the payload the row was last written from; rows whose payload did not change are not rewritten on sync.",
+                max_length=32,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0005_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["charge_at", "id"], name="djrazorpay_sub_charge_at"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["status", "charge_at", "id"],
+                name="djrazorpay_sub_status_charge",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["status", "current_end"], name="djrazorpay_sub_status_end"
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:40
+
+import djrazorpay.fields
+from django.db import migrations, models
+
+
+def clear_fingerprints(apps, schema_editor):
+    # Rows were fingerprinted before notes were stored; without this the next
+    # sync would skip them as unchanged and leave their notes empty.
+    for model_name in ["Plan", "Customer", "Subscription"]:
+        model = apps.get_model("djrazorpay", model_name)
+        model.objects.using(schema_editor.connection.alias).update(fingerprint=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0006_subscription_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="notes",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="plan",
+            name="notes",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="notes",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.CreateModel(
+            name="IndexedNote",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "model",
+                    models.CharField(help_text="Model name of the row.", max_length=32),
+                ),
+                ("object_id", djrazorpay.fields.RazorpayEntityIdField(max_length=64)),
+                ("key", models.CharField(max_length=64)),
+                ("value", models.CharField(max_length=256)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["model", "key", "value"],
+                        name="djrazorpay_indexednote_lookup",
+                    ),
+                    models.Index(
+                        fields=["model", "object_id"], name="djrazorpay_note_object"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(clear_fingerprints, migrations.RunPython.noop),
+    ]
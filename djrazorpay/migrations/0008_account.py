@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0007_notes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Account",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=64, unique=True)),
+                ("api_key", models.CharField(max_length=64, unique=True)),
+                ("secret_key", models.CharField(max_length=128)),
+                (
+                    "active",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Whether --all-accounts syncs this account.",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="account",
+            field=models.ForeignKey(
+                help_text="Account the row was synced from, if known.",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="djrazorpay.account",
+            ),
+        ),
+        migrations.AddField(
+            model_name="plan",
+            name="account",
+            field=models.ForeignKey(
+                help_text="Account the row was synced from, if known.",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="djrazorpay.account",
+            ),
+        ),
+        migrations.AddField(
+            model_name="planitem",
+            name="account",
+            field=models.ForeignKey(
+                help_text="Account the row was synced from, if known.",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="djrazorpay.account",
+            ),
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="account",
+            field=models.ForeignKey(
+                help_text="Account the row was synced from, if known.",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="djrazorpay.account",
+            ),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:45
+
+import djrazorpay.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0008_account"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("run_id", models.UUIDField()),
+                (
+                    "account",
+                    models.CharField(
+                        help_text="Razorpay API key the run syncs.", max_length=64
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        choices=[
+                            ("plan", "PLAN"),
+                            ("customer", "CUSTOMER"),
+                            ("subscription", "SUBSCRIPTION"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "synced_from",
+                    djrazorpay.fields.RazorpayDateTimeField(
+                        help_text="The run's 'from' filter, for incremental runs.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "synced_until",
+                    djrazorpay.fields.RazorpayDateTimeField(
+                        help_text="The run's pinned 'to' filter."
+                    ),
+                ),
+                (
+                    "oldest_created_at",
+                    djrazorpay.fields.RazorpayDateTimeField(null=True),
+                ),
+                (
+                    "newest_created_at",
+                    djrazorpay.fields.RazorpayDateTimeField(null=True),
+                ),
+                ("rows", models.PositiveIntegerField(default=0)),
+                ("completed", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("account", "entity"),
+                        name="djrazorpay_checkpoint_unique",
+                    )
+                ],
+            },
+        ),
+    ]
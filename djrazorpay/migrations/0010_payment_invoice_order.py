@@ -0,0 +1,279 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:47
+
+import django.db.models.deletion
+import djrazorpay.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0009_synccheckpoint"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="synccheckpoint",
+            name="entity",
+            field=models.CharField(
+                choices=[
+                    ("plan", "PLAN"),
+                    ("customer", "CUSTOMER"),
+                    ("subscription", "SUBSCRIPTION"),
+                    ("order", "ORDER"),
+                    ("payment", "PAYMENT"),
+                    ("invoice", "INVOICE"),
+                ],
+                max_length=16,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="synccursor",
+            name="entity",
+            field=models.CharField(
+                choices=[
+                    ("plan", "PLAN"),
+                    ("customer", "CUSTOMER"),
+                    ("subscription", "SUBSCRIPTION"),
+                    ("order", "ORDER"),
+                    ("payment", "PAYMENT"),
+                    ("invoice", "INVOICE"),
+                ],
+                max_length=16,
+            ),
+        ),
+        migrations.CreateModel(
+            name="Invoice",
+            fields=[
+                (
+                    "id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        max_length=64, primary_key=True, serialize=False
+                    ),
+                ),
+                ("created_at", djrazorpay.fields.RazorpayDateTimeField()),
+                (
+                    "fingerprint",
+                    djrazorpay.fields.RazorpayFingerprintField(
+                        editable=False,
+                        help_text="Digest of the payload the row was last written from; rows whose payload did not change are not rewritten on sync.",
+                        max_length=32,
+                        null=True,
+                    ),
+                ),
+                ("type", models.CharField(max_length=16)),
+                ("invoice_number", models.CharField(max_length=40, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("draft", "DRAFT"),
+                            ("issued", "ISSUED"),
+                            ("partially_paid", "PARTIALLY_PAID"),
+                            ("paid", "PAID"),
+                            ("cancelled", "CANCELLED"),
+                            ("expired", "EXPIRED"),
+                            ("deleted", "DELETED"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "customer_id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        db_index=True, max_length=64, null=True
+                    ),
+                ),
+                (
+                    "order_id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        db_index=True, max_length=64, null=True
+                    ),
+                ),
+                (
+                    "subscription_id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        db_index=True, max_length=64, null=True
+                    ),
+                ),
+                (
+                    "payment_id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        db_index=True, max_length=64, null=True
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("amount_paid", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("amount_due", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("currency", models.CharField(max_length=4)),
+                ("description", models.CharField(max_length=255, null=True)),
+                ("short_url", models.URLField(null=True)),
+                ("date", djrazorpay.fields.RazorpayDateTimeField(null=True)),
+                ("issued_at", djrazorpay.fields.RazorpayDateTimeField(null=True)),
+                ("paid_at", djrazorpay.fields.RazorpayDateTimeField(null=True)),
+                ("cancelled_at", djrazorpay.fields.RazorpayDateTimeField(null=True)),
+                ("expired_at", djrazorpay.fields.RazorpayDateTimeField(null=True)),
+                ("notes", models.JSONField(default=dict)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        help_text="Account the row was synced from, if known.",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="djrazorpay.account",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="Order",
+            fields=[
+                (
+                    "id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        max_length=64, primary_key=True, serialize=False
+                    ),
+                ),
+                ("created_at", djrazorpay.fields.RazorpayDateTimeField()),
+                (
+                    "fingerprint",
+                    djrazorpay.fields.RazorpayFingerprintField(
+                        editable=False,
+                        help_text="Digest of the payload the row was last written from; rows whose payload did not change are not rewritten on sync.",
+                        max_length=32,
+                        null=True,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("amount_paid", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("amount_due", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("currency", models.CharField(max_length=4)),
+                ("receipt", models.CharField(max_length=40, null=True)),
+                ("offer_id", models.CharField(max_length=32, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("created", "CREATED"),
+                            ("attempted", "ATTEMPTED"),
+                            ("paid", "PAID"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("attempts", models.IntegerField()),
+                ("notes", models.JSONField(default=dict)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        help_text="Account the row was synced from, if known.",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="djrazorpay.account",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="Payment",
+            fields=[
+                (
+                    "id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        max_length=64, primary_key=True, serialize=False
+                    ),
+                ),
+                ("created_at", djrazorpay.fields.RazorpayDateTimeField()),
+                (
+                    "fingerprint",
+                    djrazorpay.fields.RazorpayFingerprintField(
+                        editable=False,
+                        help_text="Digest of the payload the row was last written from; rows whose payload did not change are not rewritten on sync.",
+                        max_length=32,
+                        null=True,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("currency", models.CharField(max_length=4)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("created", "CREATED"),
+                            ("authorized", "AUTHORIZED"),
+                            ("captured", "CAPTURED"),
+                            ("refunded", "REFUNDED"),
+                            ("failed", "FAILED"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("method", models.CharField(max_length=16)),
+                (
+                    "order_id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        db_index=True, max_length=64, null=True
+                    ),
+                ),
+                (
+                    "invoice_id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        db_index=True, max_length=64, null=True
+                    ),
+                ),
+                (
+                    "customer_id",
+                    djrazorpay.fields.RazorpayEntityIdField(
+                        db_index=True, max_length=64, null=True
+                    ),
+                ),
+                ("international", models.BooleanField()),
+                (
+                    "amount_refunded",
+                    models.DecimalField(decimal_places=2, max_digits=14),
+                ),
+                ("refund_status", models.CharField(max_length=16, null=True)),
+                ("captured", models.BooleanField()),
+                ("description", models.CharField(max_length=255, null=True)),
+                ("email", models.CharField(max_length=64, null=True)),
+                ("contact", models.CharField(max_length=16, null=True)),
+                (
+                    "fee",
+                    models.DecimalField(decimal_places=2, max_digits=14, null=True),
+                ),
+                (
+                    "tax",
+                    models.DecimalField(decimal_places=2, max_digits=14, null=True),
+                ),
+                ("error_code", models.CharField(max_length=64, null=True)),
+                ("error_description", models.CharField(max_length=255, null=True)),
+                ("notes", models.JSONField(default=dict)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        help_text="Account the row was synced from, if known.",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="djrazorpay.account",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="djrazorpay_payment_status",
+                    )
+                ],
+            },
+        ),
+    ]
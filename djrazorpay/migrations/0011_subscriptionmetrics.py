@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0010_payment_invoice_order"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubscriptionMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("created", "CREATED"),
+                            ("authenticated", "AUTHENTICATED"),
+                            ("active", "ACTIVE"),
+                            ("pending", "PENDING"),
+                            ("halted", "HALTED"),
+                            ("cancelled", "CANCELLED"),
+                            ("completed", "COMPLETED"),
+                            ("expired", "EXPIRED"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "mrr",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "entered",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Subscriptions that moved into this plan and status.",
+                    ),
+                ),
+                (
+                    "plan",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="djrazorpay.plan",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "plan", "status"),
+                        name="djrazorpay_metrics_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0011_subscriptionmetrics"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="webhookevent",
+            name="djrazorpay_webhook_pending",
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="failed_at",
+            field=models.DateTimeField(
+                help_text="Set when applying the event failed; it is skipped.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="last_error",
+            field=models.TextField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="webhookevent",
+            index=models.Index(
+                fields=["processed_at", "failed_at", "received_at"],
+                name="djrazorpay_webhook_pending",
+            ),
+        ),
+    ]
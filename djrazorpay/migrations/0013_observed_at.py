@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0012_webhookevent_failed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="observed_at",
+            field=models.DateTimeField(
+                editable=False,
+                help_text="When Razorpay reported the stored state: the time of the webhook event or sync it was last written from. Older states are not written over it.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="observed_at",
+            field=models.DateTimeField(
+                editable=False,
+                help_text="When Razorpay reported the stored state: the time of the webhook event or sync it was last written from. Older states are not written over it.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="observed_at",
+            field=models.DateTimeField(
+                editable=False,
+                help_text="When Razorpay reported the stored state: the time of the webhook event or sync it was last written from. Older states are not written over it.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="observed_at",
+            field=models.DateTimeField(
+                editable=False,
+                help_text="When Razorpay reported the stored state: the time of the webhook event or sync it was last written from. Older states are not written over it.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="plan",
+            name="observed_at",
+            field=models.DateTimeField(
+                editable=False,
+                help_text="When Razorpay reported the stored state: the time of the webhook event or sync it was last written from. Older states are not written over it.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="planitem",
+            name="observed_at",
+            field=models.DateTimeField(
+                editable=False,
+                help_text="When Razorpay reported the stored state: the time of the webhook event or sync it was last written from. Older states are not written over it.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="observed_at",
+            field=models.DateTimeField(
+                editable=False,
+                help_text="When Razorpay reported the stored state: the time of the webhook event or sync it was last written from. Older states are not written over it.",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_accounts(apps, schema_editor):
+    # Cursors and checkpoints were kept by API key; move those of keys with an
+    # Account to it so they follow the account when its key is rotated.
+    db = schema_editor.connection.alias
+    Account = apps.get_model("djrazorpay", "Account")
+    accounts = dict(Account.objects.using(db).values_list("api_key", "pk"))
+    for model_name in ["SyncCursor", "SyncCheckpoint"]:
+        model = apps.get_model("djrazorpay", model_name)
+        for api_key, account_id in accounts.items():
+            model.objects.using(db).filter(api_key=api_key).update(
+                account_id=account_id, api_key=""
+            )
+
+
+def unlink_accounts(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Account = apps.get_model("djrazorpay", "Account")
+    for model_name in ["SyncCursor", "SyncCheckpoint"]:
+        model = apps.get_model("djrazorpay", model_name)
+        for account in Account.objects.using(db):
+            model.objects.using(db).filter(account_id=account.pk).update(
+                api_key=account.api_key
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djrazorpay", "0013_observed_at"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="synccursor",
+            name="djrazorpay_synccursor_unique",
+        ),
+        migrations.RemoveConstraint(
+            model_name="synccheckpoint",
+            name="djrazorpay_checkpoint_unique",
+        ),
+        migrations.RenameField(
+            model_name="synccursor",
+            old_name="account",
+            new_name="api_key",
+        ),
+        migrations.RenameField(
+            model_name="synccheckpoint",
+            old_name="account",
+            new_name="api_key",
+        ),
+        migrations.AlterField(
+            model_name="synccursor",
+            name="api_key",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Razorpay API key the cursor belongs to, if it has no account.",
+                max_length=64,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="synccheckpoint",
+            name="api_key",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Razorpay API key the run syncs, if it has no account.",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="synccursor",
+            name="account",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="djrazorpay.account",
+            ),
+        ),
+        migrations.AddField(
+            model_name="synccheckpoint",
+            name="account",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="djrazorpay.account",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="synccursor",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("account__isnull", False)),
+                fields=("account", "entity"),
+                name="djrazorpay_synccursor_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="synccursor",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("account__isnull", True)),
+                fields=("api_key", "entity"),
+                name="djrazorpay_synccursor_key_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="synccheckpoint",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("account__isnull", False)),
+                fields=("account", "entity"),
+                name="djrazorpay_checkpoint_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="synccheckpoint",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("account__isnull", True)),
+                fields=("api_key", "entity"),
+                name="djrazorpay_checkpoint_key_unique",
+            ),
+        ),
+        # Last, as PostgreSQL refuses DDL once FK values changed in the same
+        # transaction. The constraints hold before and after.
+        migrations.RunPython(link_accounts, unlink_accounts),
+    ]
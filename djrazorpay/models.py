@@ -1,18 +1,284 @@
 import datetime
+from collections.abc import Iterable, Iterator
+from typing import Any, ClassVar
 
-from django.db import models
+from django.db import connections, models
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast
+from django.db.models.lookups import GreaterThan
 
-from djrazorpay.enums import PlanPeriod, SubscriptionStatus
-from djrazorpay.fields import RazorpayDateTimeField, RazorpayEntityIdField
+from djrazorpay.cache import entitlement_cache
+from djrazorpay.enums import (
+    InvoiceStatus,
+    OrderStatus,
+    PaymentStatus,
+    PlanPeriod,
+    SubscriptionStatus,
+    SyncEntity,
+)
+from djrazorpay.fields import (
+    RazorpayDateTimeField,
+    RazorpayEntityIdField,
+    RazorpayFingerprintField,
+)
+from djrazorpay.mapping import (
+    Amount,
+    Local,
+    Notes,
+    RazorpayField,
+    compile_converter,
+)
+from djrazorpay.notes import indexed_notes_keys, uses_note_table
+from djrazorpay.utils import from_timestamp
+
+
+class RowValue(models.Func):
+    """
+    A SQL row value such as ``(charge_at, id)``. Row values compare
+    element by element, and databases seek a matching composite index to the
+    first row greater than one.
+    """
+
+    template = "(%(expressions)s)"
+    output_field = models.Field()
+
+
+class RazorpayQuerySet(models.QuerySet):
+    def bulk_upsert(
+        self,
+        objs: Iterable[models.Model],
+        batch_size: int | None = None,
+        exclude: Iterable[str] = (),
+    ):
+        """
+        Insert ``objs``, overwriting every non-primary-key column of rows whose
+        Razorpay ID already exists, except the fields named in ``exclude``.
+        Issues one ``INSERT ... ON CONFLICT`` (``ON DUPLICATE KEY UPDATE`` on
+        MySQL) per ``batch_size`` objects instead of a SELECT plus
+        UPDATE/INSERT per row.
+        """
+        exclude = set(exclude)
+        update_fields = [
+            field.name
+            for field in self.model._meta.concrete_fields
+            if not field.primary_key and field.name not in exclude
+        ]
+        # MySQL and MariaDB cannot name the conflicting columns; Django
+        # refuses unique_fields there.
+        unique_fields = (
+            [self.model._meta.pk.name]
+            if connections[self.db].features.supports_update_conflicts_with_target
+            else None
+        )
+        return self.bulk_create(
+            objs,
+            batch_size=batch_size,
+            update_conflicts=True,
+            update_fields=update_fields,
+            unique_fields=unique_fields,
+        )
+
+    def by_note(self, key: str, value: Any) -> "RazorpayQuerySet":
+        """
+        Rows whose ``notes[key]`` equals ``value``, compared as text. Keys in
+        ``DJRAZORPAY_INDEXED_NOTES_KEYS`` are looked up through an index; see
+        ``djrazorpay.notes``.
+        """
+        if key not in indexed_notes_keys():
+            # notes ->> key keeps the JSON type of the value on SQLite; cast it
+            # so numbers compare as text there too.
+            return self.alias(
+                note=Cast(KeyTextTransform(key, "notes"), models.TextField())
+            ).filter(note=str(value))
+        if uses_note_table(self.db):
+            return self.filter(
+                pk__in=IndexedNote.objects.filter(
+                    model=self.model._meta.model_name, key=key, value=str(value)
+                ).values("object_id")
+            )
+        # Spelled like the expression index, notes ->> key, so it is used.
+        return self.alias(note=KeyTextTransform(key, "notes")).filter(note=str(value))
+
+
+# Statuses in which a subscription grants access to its plan: ``pending``
+# subscriptions are still being retried and keep access until they halt.
+ENTITLED_STATUSES = (
+    SubscriptionStatus.ACTIVE,
+    SubscriptionStatus.AUTHENTICATED,
+    SubscriptionStatus.PENDING,
+)
+
+
+class SubscriptionQuerySet(RazorpayQuerySet):
+    def in_status(self, *statuses: SubscriptionStatus) -> "SubscriptionQuerySet":
+        return self.filter(status__in=statuses)
+
+    def due_between(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> "SubscriptionQuerySet":
+        """Subscriptions to be charged from ``start`` (inclusive) to ``end``."""
+        return self.filter(charge_at__gte=start, charge_at__lt=end)
+
+    def keyset_iterator(self, batch_size: int = 1000) -> Iterator["Subscription"]:
+        """
+        Yield the subscriptions ordered by ``(charge_at, id)``, those without
+        ``charge_at`` last, reading ``batch_size`` rows per query. Each query
+        seeks past the last row seen instead of using OFFSET, so every page
+        is an index range scan however deep the iteration goes.
+        """
+        charged = self.filter(charge_at__isnull=False).order_by("charge_at", "id")
+        last = None
+        while True:
+            page = charged
+            if last is not None:
+                # Not charge_at > x OR (charge_at = x AND id > y): that scans
+                # every earlier row sharing charge_at x again on SQLite.
+                page = page.filter(
+                    GreaterThan(
+                        RowValue("charge_at", "id"),
+                        RowValue(
+                            models.Value(
+                                last.charge_at,
+                                output_field=self.model._meta.get_field("charge_at"),
+                            ),
+                            models.Value(last.id),
+                        ),
+                    )
+                )
+            rows = list(page[:batch_size])
+            yield from rows
+            if len(rows) < batch_size:
+                break
+            last = rows[-1]
+
+        uncharged = self.filter(charge_at__isnull=True).order_by("id")
+        last_id = None
+        while True:
+            page = uncharged if last_id is None else uncharged.filter(id__gt=last_id)
+            rows = list(page[:batch_size])
+            yield from rows
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1].id
+
+    def active_for_customer(self, customer_id: str) -> "SubscriptionQuerySet":
+        """Subscriptions of ``customer_id`` that currently grant access."""
+        return self.filter(
+            customer_id=customer_id,
+            status__in=ENTITLED_STATUSES,
+            ended_at=None,
+        )
+
+
+class SubscriptionManager(models.Manager.from_queryset(SubscriptionQuerySet)):
+    """
+    Entitlements are cached by customer alone, so they are looked up here,
+    always on every subscription, rather than on querysets whose filters would
+    leak into the shared cache.
+    """
+
+    def entitled_plan_ids(self, customer_id: str) -> frozenset[str]:
+        """
+        IDs of the plans ``customer_id`` has access to, cached per process and
+        in the Django cache. Sync and webhook processing invalidate the entry
+        when a subscription's status, current_end or ended_at changes.
+        """
+        return entitlement_cache.get_or_set(
+            customer_id,
+            lambda: frozenset(
+                self.get_queryset()
+                .active_for_customer(customer_id)
+                .values_list("plan_id", flat=True)
+            ),
+        )
+
+    def is_entitled(self, customer_id: str, plan_id: str) -> bool:
+        return plan_id in self.entitled_plan_ids(customer_id)
+
+
+class Account(models.Model):
+    """Credentials of a Razorpay merchant account synced by this app."""
+
+    name = models.CharField(max_length=64, unique=True)
+    api_key = models.CharField(max_length=64, unique=True)
+    secret_key = models.CharField(max_length=128)
+    active = models.BooleanField(
+        default=True, help_text="Whether --all-accounts syncs this account."
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.name
 
 
 class RazorpayBaseModel(models.Model):
     id: str = RazorpayEntityIdField(primary_key=True)
+    account = models.ForeignKey(
+        Account,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name="+",
+        help_text="Account the row was synced from, if known.",
+    )
     created_at: datetime = RazorpayDateTimeField(null=False)
+    fingerprint = RazorpayFingerprintField(
+        help_text="Digest of the payload the row was last written from; rows "
+        "whose payload did not change are not rewritten on sync."
+    )
+    observed_at = models.DateTimeField(
+        null=True,
+        editable=False,
+        help_text="When Razorpay reported the stored state: the time of the "
+        "webhook event or sync it was last written from. Older states are not "
+        "written over it.",
+    )
+
+    objects = RazorpayQuerySet.as_manager()
+
+    # How fields differ from the API payload, merged with those of subclasses;
+    # see djrazorpay.mapping.
+    razorpay_fields: ClassVar[dict[str, RazorpayField]] = {
+        "account": Local(),
+        "observed_at": Local(),
+    }
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_razorpay(cls, data: dict) -> "RazorpayBaseModel":
+        """Build an unsaved instance from a Razorpay API payload."""
+        return compile_converter(cls)(data)
+
+
+class SubscriptionMetricsQuerySet(models.QuerySet):
+    def totals(self, on: datetime.date | None = None) -> models.QuerySet:
+        """
+        Subscription count and MRR per plan and status at the end of ``on``
+        (default: now), as dicts with ``plan_id``, ``status``, ``count`` and
+        ``mrr``.
+        """
+        rows = self if on is None else self.filter(day__lte=on)
+        return (
+            rows.values("plan_id", "status")
+            .annotate(count=models.Sum("count"), mrr=models.Sum("mrr"))
+            .order_by("plan_id", "status")
+        )
+
+    def entered(
+        self, start: datetime.date, end: datetime.date, *statuses: SubscriptionStatus
+    ) -> int:
+        """
+        Number of times a subscription moved into one of ``statuses`` from
+        ``start`` to ``end`` (inclusive), e.g. cancellations for churn.
+        """
+        return (
+            self.filter(day__gte=start, day__lte=end, status__in=statuses).aggregate(
+                entered=models.Sum("entered")
+            )["entered"]
+            or 0
+        )
+
 
 class PlanItem(RazorpayBaseModel):
     active = models.BooleanField()
@@ -31,6 +297,8 @@ class PlanItem(RazorpayBaseModel):
     tax_group_id = models.CharField(max_length=32, null=True)
     updated_at = RazorpayDateTimeField(null=False)
 
+    razorpay_fields = {"amount": Amount(), "unit_amount": Amount()}
+
 
 class Plan(RazorpayBaseModel):
     interval = models.IntegerField()
@@ -40,7 +308,9 @@ class Plan(RazorpayBaseModel):
         help_text="Defines the frequency of the plan.",
     )
     item = models.OneToOneField(PlanItem, on_delete=models.CASCADE)
-    # notes = models.JSONField()
+    notes = models.JSONField(default=dict)
+
+    razorpay_fields = {"item": RazorpayField("item.id"), "notes": Notes()}
 
 
 class Customer(RazorpayBaseModel):
@@ -48,7 +318,9 @@ class Customer(RazorpayBaseModel):
     email = models.CharField(max_length=64)
     contact = models.CharField(max_length=16)
     gstin = models.CharField(max_length=16, null=True)
-    # notes = models.JSONField()
+    notes = models.JSONField(default=dict)
+
+    razorpay_fields = {"notes": Notes()}
 
 
 class Subscription(RazorpayBaseModel):
@@ -59,7 +331,7 @@ class Subscription(RazorpayBaseModel):
     current_end = RazorpayDateTimeField(null=True)
     ended_at = RazorpayDateTimeField(null=True)
     quantity = models.IntegerField()
-    # notes = models.JSONField()
+    notes = models.JSONField(default=dict)
     charge_at = RazorpayDateTimeField(null=True)
     start_at = RazorpayDateTimeField(null=True)
     end_at = RazorpayDateTimeField(null=True)
@@ -74,3 +346,314 @@ class Subscription(RazorpayBaseModel):
     source = models.CharField(max_length=16)
     offer_id = models.CharField(max_length=32, null=True)
     remaining_count = models.IntegerField()
+
+    objects = SubscriptionManager()
+
+    razorpay_fields = {"notes": Notes()}
+
+    # Changes to these fields invalidate the customer's cached entitlements.
+    entitlement_fields = ("customer_id", "status", "current_end", "ended_at")
+    # Changes to these fields move the subscription between metrics rows.
+    metrics_fields = ("plan_id", "status", "quantity")
+
+    class Meta:
+        indexes = [
+            # Billing and dunning scans: due_between/in_status walked with
+            # keyset_iterator, and renewals by status and current_end.
+            models.Index(fields=["charge_at", "id"], name="djrazorpay_sub_charge_at"),
+            models.Index(
+                fields=["status", "charge_at", "id"],
+                name="djrazorpay_sub_status_charge",
+            ),
+            models.Index(
+                fields=["status", "current_end"], name="djrazorpay_sub_status_end"
+            ),
+        ]
+
+
+class Order(RazorpayBaseModel):
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=14, decimal_places=2)
+    amount_due = models.DecimalField(max_digits=14, decimal_places=2)
+    currency = models.CharField(max_length=4)
+    receipt = models.CharField(max_length=40, null=True)
+    offer_id = models.CharField(max_length=32, null=True)
+    status = models.CharField(max_length=16, choices=OrderStatus.choices())
+    attempts = models.IntegerField()
+    notes = models.JSONField(default=dict)
+
+    razorpay_fields = {
+        "amount": Amount(),
+        "amount_paid": Amount(),
+        "amount_due": Amount(),
+        "notes": Notes(),
+    }
+
+
+# Payments, invoices and orders can number in the millions, so their
+# references are stored as plain indexed IDs rather than foreign keys: rows
+# are written as they stream in, without checking or ordering by what they
+# point to.
+
+
+class Payment(RazorpayBaseModel):
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    currency = models.CharField(max_length=4)
+    status = models.CharField(max_length=16, choices=PaymentStatus.choices())
+    method = models.CharField(max_length=16)
+    order_id = RazorpayEntityIdField(null=True, db_index=True)
+    invoice_id = RazorpayEntityIdField(null=True, db_index=True)
+    customer_id = RazorpayEntityIdField(null=True, db_index=True)
+    international = models.BooleanField()
+    amount_refunded = models.DecimalField(max_digits=14, decimal_places=2)
+    refund_status = models.CharField(max_length=16, null=True)
+    captured = models.BooleanField()
+    description = models.CharField(max_length=255, null=True)
+    email = models.CharField(max_length=64, null=True)
+    contact = models.CharField(max_length=16, null=True)
+    fee = models.DecimalField(max_digits=14, decimal_places=2, null=True)
+    tax = models.DecimalField(max_digits=14, decimal_places=2, null=True)
+    error_code = models.CharField(max_length=64, null=True)
+    error_description = models.CharField(max_length=255, null=True)
+    notes = models.JSONField(default=dict)
+
+    razorpay_fields = {
+        "amount": Amount(),
+        "amount_refunded": Amount(),
+        "fee": Amount(),
+        "tax": Amount(),
+        "notes": Notes(),
+    }
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"], name="djrazorpay_payment_status"
+            ),
+        ]
+
+
+class Invoice(RazorpayBaseModel):
+    type = models.CharField(max_length=16)
+    invoice_number = models.CharField(max_length=40, null=True)
+    status = models.CharField(max_length=16, choices=InvoiceStatus.choices())
+    customer_id = RazorpayEntityIdField(null=True, db_index=True)
+    order_id = RazorpayEntityIdField(null=True, db_index=True)
+    subscription_id = RazorpayEntityIdField(null=True, db_index=True)
+    payment_id = RazorpayEntityIdField(null=True, db_index=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=14, decimal_places=2)
+    amount_due = models.DecimalField(max_digits=14, decimal_places=2)
+    currency = models.CharField(max_length=4)
+    description = models.CharField(max_length=255, null=True)
+    short_url = models.URLField(null=True)
+    date = RazorpayDateTimeField(null=True)
+    issued_at = RazorpayDateTimeField(null=True)
+    paid_at = RazorpayDateTimeField(null=True)
+    cancelled_at = RazorpayDateTimeField(null=True)
+    expired_at = RazorpayDateTimeField(null=True)
+    notes = models.JSONField(default=dict)
+
+    razorpay_fields = {
+        "amount": Amount(),
+        "amount_paid": Amount(),
+        "amount_due": Amount(),
+        "notes": Notes(),
+    }
+
+
+# The model of each top-level entity type.
+ENTITY_MODELS: dict[SyncEntity, type[RazorpayBaseModel]] = {
+    SyncEntity.PLAN: Plan,
+    SyncEntity.CUSTOMER: Customer,
+    SyncEntity.SUBSCRIPTION: Subscription,
+    SyncEntity.ORDER: Order,
+    SyncEntity.PAYMENT: Payment,
+    SyncEntity.INVOICE: Invoice,
+}
+
+
+class SyncCursor(models.Model):
+    """
+    High-watermark of the newest entity synced, per account and entity type.
+    Cursors of API keys without an ``Account`` are kept by ``api_key``.
+    """
+
+    account = models.ForeignKey(
+        Account, null=True, on_delete=models.CASCADE, related_name="+"
+    )
+    api_key = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="Razorpay API key the cursor belongs to, if it has no account.",
+    )
+    entity = models.CharField(max_length=16, choices=SyncEntity.choices())
+    last_created_at = RazorpayDateTimeField(
+        help_text="Creation time of the newest entity synced so far."
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "entity"],
+                condition=models.Q(account__isnull=False),
+                name="djrazorpay_synccursor_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["api_key", "entity"],
+                condition=models.Q(account__isnull=True),
+                name="djrazorpay_synccursor_key_unique",
+            ),
+        ]
+
+
+class SyncCheckpoint(models.Model):
+    """
+    Progress of an unfinished sync run for one account and entity type, so
+    ``djrazorpay_sync_models --resume`` can continue where it stopped.
+
+    Razorpay lists entities newest first and the run pins its ``to`` filter,
+    so every entity created from ``oldest_created_at`` up to ``synced_until``
+    is already written; a resumed run lists from there down instead of
+    replaying skip offsets. Like cursors, checkpoints of API keys without an
+    ``Account`` are kept by ``api_key``.
+    """
+
+    run_id = models.UUIDField()
+    account = models.ForeignKey(
+        Account, null=True, on_delete=models.CASCADE, related_name="+"
+    )
+    api_key = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="Razorpay API key the run syncs, if it has no account.",
+    )
+    entity = models.CharField(max_length=16, choices=SyncEntity.choices())
+    synced_from = RazorpayDateTimeField(
+        null=True, help_text="The run's 'from' filter, for incremental runs."
+    )
+    synced_until = RazorpayDateTimeField(help_text="The run's pinned 'to' filter.")
+    oldest_created_at = RazorpayDateTimeField(null=True)
+    newest_created_at = RazorpayDateTimeField(null=True)
+    rows = models.PositiveIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "entity"],
+                condition=models.Q(account__isnull=False),
+                name="djrazorpay_checkpoint_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["api_key", "entity"],
+                condition=models.Q(account__isnull=True),
+                name="djrazorpay_checkpoint_key_unique",
+            ),
+        ]
+
+    def list_filters(self) -> dict[str, int]:
+        """Filters listing the entities of the run not written yet."""
+        until = self.oldest_created_at or self.synced_until
+        # ``to`` is inclusive, so entities sharing the oldest second written
+        # are fetched again; the upsert makes that harmless.
+        filters = {"to": int(until.timestamp())}
+        if self.synced_from is not None:
+            filters["from"] = int(self.synced_from.timestamp())
+        return filters
+
+    def advance(self, batch: list[dict]) -> None:
+        """Record that ``batch`` has been written."""
+        created = [from_timestamp(data["created_at"]) for data in batch]
+        self.oldest_created_at = min(filter(None, [self.oldest_created_at, *created]))
+        self.newest_created_at = max(filter(None, [self.newest_created_at, *created]))
+        self.rows += len(batch)
+        self.save(
+            update_fields=[
+                "oldest_created_at",
+                "newest_created_at",
+                "rows",
+                "updated_at",
+            ]
+        )
+
+
+class WebhookEvent(models.Model):
+    """
+    A webhook delivery stored verbatim for ``djrazorpay_process_events``.
+    Deliveries are deduplicated on the ``X-Razorpay-Event-Id`` header. Events
+    that could not be applied keep their error and are skipped until
+    ``failed_at`` is cleared, e.g. with ``--retry-failed``.
+    """
+
+    id = RazorpayEntityIdField(primary_key=True)
+    body = models.TextField(help_text="Raw request body as signed by Razorpay.")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True)
+    failed_at = models.DateTimeField(
+        null=True, help_text="Set when applying the event failed; it is skipped."
+    )
+    last_error = models.TextField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["processed_at", "failed_at", "received_at"],
+                name="djrazorpay_webhook_pending",
+            )
+        ]
+
+
+class IndexedNote(models.Model):
+    """
+    A notes entry under ``DJRAZORPAY_INDEXED_NOTES_KEYS`` of a Razorpay row,
+    for ``by_note`` lookups on databases without JSON expression indexes.
+    """
+
+    model = models.CharField(max_length=32, help_text="Model name of the row.")
+    object_id = RazorpayEntityIdField()
+    key = models.CharField(max_length=64)
+    value = models.CharField(max_length=256)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["model", "key", "value"], name="djrazorpay_indexednote_lookup"
+            ),
+            models.Index(fields=["model", "object_id"], name="djrazorpay_note_object"),
+        ]
+
+
+class SubscriptionMetrics(models.Model):
+    """
+    Net change per day in the number and MRR of subscriptions of a plan in a
+    status, so that totals add up a few rows per plan and status instead of
+    scanning subscriptions. Kept up to date by ``EntityWriter`` and rebuilt
+    from the subscriptions by ``djrazorpay_rebuild_metrics``.
+
+    MRR is the plan amount times the quantity, normalised to a month; it is
+    kept for every status, so the MRR of a business is that of its active
+    subscriptions.
+    """
+
+    day = models.DateField()
+    plan = models.ForeignKey(Plan, on_delete=models.CASCADE, related_name="+")
+    status = models.CharField(max_length=16, choices=SubscriptionStatus.choices())
+    count = models.IntegerField(default=0)
+    mrr = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    entered = models.IntegerField(
+        default=0, help_text="Subscriptions that moved into this plan and status."
+    )
+
+    objects = SubscriptionMetricsQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "plan", "status"], name="djrazorpay_metrics_unique"
+            )
+        ]
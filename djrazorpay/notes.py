@@ -0,0 +1,119 @@
+"""
+Indexed lookups of rows by the notes stored on Razorpay entities.
+
+The notes keys listed in ``DJRAZORPAY_INDEXED_NOTES_KEYS`` are indexed for
+``by_note``: on PostgreSQL with an expression index on ``notes ->> key`` per
+model and key, created after ``migrate``; on other databases, SQLite mainly,
+in the ``IndexedNote`` side table, which ``EntityWriter`` keeps up to date.
+After changing the setting, run ``djrazorpay_index_notes`` to index the rows
+already stored.
+"""
+
+import hashlib
+import re
+from collections.abc import Iterable
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models.fields.json import KeyTextTransform
+
+from djrazorpay.utils import chunked
+
+
+def indexed_notes_keys() -> list[str]:
+    return list(getattr(settings, "DJRAZORPAY_INDEXED_NOTES_KEYS", []))
+
+
+def uses_note_table(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """Whether indexed notes are kept in ``IndexedNote`` rather than indexes."""
+    return connections[using].vendor != "postgresql"
+
+
+def notes_models() -> list[type[models.Model]]:
+    return [
+        model
+        for model in apps.get_app_config("djrazorpay").get_models()
+        if any(field.name == "notes" for field in model._meta.concrete_fields)
+    ]
+
+
+def note_index(model: type[models.Model], key: str) -> models.Index:
+    slug = re.sub(r"[^a-z0-9]+", "_", key.lower())[:7]
+    digest = hashlib.md5(f"{model._meta.db_table}.{key}".encode()).hexdigest()[:6]
+    return models.Index(
+        KeyTextTransform(key, "notes"),
+        name=f"djrazorpay_note_{slug}_{digest}",
+    )
+
+
+def create_note_indexes(using: str = DEFAULT_DB_ALIAS, **kwargs) -> None:
+    """
+    Create the missing expression indexes of ``DJRAZORPAY_INDEXED_NOTES_KEYS``
+    on PostgreSQL. Connected to ``post_migrate``.
+    """
+    keys = indexed_notes_keys()
+    if not keys or uses_note_table(using):
+        return
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+    for model in notes_models():
+        if model._meta.db_table not in tables:
+            continue
+        with connection.cursor() as cursor:
+            existing = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        with connection.schema_editor() as schema_editor:
+            for key in keys:
+                index = note_index(model, key)
+                if index.name not in existing:
+                    schema_editor.add_index(model, index)
+
+
+def index_notes(
+    model: type[models.Model],
+    objs: Iterable[models.Model],
+    using: str = DEFAULT_DB_ALIAS,
+) -> None:
+    """Replace the ``IndexedNote`` rows of ``objs`` on side-table databases."""
+    keys = indexed_notes_keys()
+    if not keys or not uses_note_table(using):
+        return
+    IndexedNote = apps.get_model("djrazorpay", "IndexedNote")
+    objs = list(objs)
+    model_name = model._meta.model_name
+    with transaction.atomic(using):
+        IndexedNote.objects.using(using).filter(
+            model=model_name, object_id__in=[obj.pk for obj in objs]
+        ).delete()
+        IndexedNote.objects.using(using).bulk_create(
+            IndexedNote(
+                model=model_name, object_id=obj.pk, key=key, value=str(obj.notes[key])
+            )
+            for obj in objs
+            for key in keys
+            if obj.notes.get(key) is not None
+        )
+
+
+def reindex_notes(using: str = DEFAULT_DB_ALIAS, batch_size: int = 1000) -> int:
+    """
+    Index the notes of every stored row under the current setting and return
+    the number of rows indexed.
+    """
+    if not uses_note_table(using):
+        create_note_indexes(using)
+        return 0
+    IndexedNote = apps.get_model("djrazorpay", "IndexedNote")
+    IndexedNote.objects.using(using).all().delete()
+    if not indexed_notes_keys():
+        return 0
+    indexed = 0
+    for model in notes_models():
+        rows = model.objects.using(using).only("pk", "notes").order_by("pk")
+        for batch in chunked(rows.iterator(chunk_size=batch_size), batch_size):
+            index_notes(model, batch, using)
+            indexed += len(batch)
+    return indexed
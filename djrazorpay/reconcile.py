@@ -0,0 +1,126 @@
+"""
+Read-only comparison of stored rows with the entities Razorpay returns.
+
+Razorpay lists entities newest first, so both sides are streamed in
+descending ``created_at`` order and merged like two sorted files. The API does
+not order entities created in the same second by ID, so each second is
+matched up as a group: memory is bounded by the largest such group, not by
+the size of the account.
+"""
+
+import datetime
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from itertools import groupby
+from typing import Any, NamedTuple
+
+from django.db import models
+
+from djrazorpay.enums import DriftKind
+from djrazorpay.mapping import compile_converter, payload_fields
+from djrazorpay.models import Plan, PlanItem
+
+# Related rows whose payload is embedded in that of a model, by field name.
+EMBEDDED = {Plan: {"item": PlanItem}}
+
+
+class Drift(NamedTuple):
+    """
+    A difference for one entity. ``fields`` maps each mismatched attribute to
+    its stored and its Razorpay value.
+    """
+
+    kind: DriftKind
+    entity_id: str
+    fields: dict[str, tuple[Any, Any]]
+
+
+def by_second(
+    objs: Iterable[models.Model],
+) -> Iterator[tuple[datetime.datetime, list[models.Model]]]:
+    for created_at, group in groupby(objs, key=lambda obj: obj.created_at):
+        yield created_at, list(group)
+
+
+def compare(
+    fields: list[models.Field], stored: models.Model, remote: models.Model
+) -> dict[str, tuple[Any, Any]]:
+    return {
+        field.attname: (stored_value, remote_value)
+        for field in fields
+        if (stored_value := getattr(stored, field.attname))
+        != (remote_value := getattr(remote, field.attname))
+    }
+
+
+def diff(
+    model: type[models.Model],
+    remote: Iterable[dict],
+    stored: Iterable[models.Model],
+    counts: Counter | None = None,
+) -> Iterator[Drift]:
+    """
+    Yield the differences between ``remote`` payloads and ``stored`` rows of
+    ``model``, both newest first. Payloads are converted like the sync does,
+    so a row that the sync would not change has no differences. Embedded
+    related rows, such as a plan's item, are compared too; their differences
+    are named ``<field>.<attribute>``. The number of entities compared and of
+    each kind of drift is added to ``counts``.
+    """
+    counts = Counter() if counts is None else counts
+    convert = compile_converter(model)
+    fields = payload_fields(model)
+    embedded = [
+        (name, compile_converter(related), payload_fields(related))
+        for name, related in EMBEDDED.get(model, {}).items()
+    ]
+
+    def convert_remote(data: dict) -> models.Model:
+        obj = convert(data)
+        for name, convert_related, _ in embedded:
+            setattr(obj, name, convert_related(data[name]))
+        return obj
+
+    remote_groups = by_second(convert_remote(data) for data in remote)
+    stored_groups = by_second(stored)
+    remote_group = next(remote_groups, None)
+    stored_group = next(stored_groups, None)
+    while remote_group is not None or stored_group is not None:
+        if stored_group is None or (
+            remote_group is not None and remote_group[0] > stored_group[0]
+        ):
+            missing, extra = remote_group[1], []
+            remote_group = next(remote_groups, None)
+        elif remote_group is None or stored_group[0] > remote_group[0]:
+            missing, extra = [], stored_group[1]
+            stored_group = next(stored_groups, None)
+        else:
+            rows = {obj.pk: obj for obj in stored_group[1]}
+            missing = []
+            for obj in remote_group[1]:
+                row = rows.pop(obj.pk, None)
+                if row is None:
+                    missing.append(obj)
+                    continue
+                counts["compared"] += 1
+                mismatched = compare(fields, row, obj)
+                for name, _, related_fields in embedded:
+                    related = compare(
+                        related_fields, getattr(row, name), getattr(obj, name)
+                    )
+                    for attname, values in related.items():
+                        mismatched[f"{name}.{attname}"] = values
+                if mismatched:
+                    counts[DriftKind.MISMATCH] += 1
+                    yield Drift(DriftKind.MISMATCH, obj.pk, mismatched)
+            extra = list(rows.values())
+            remote_group = next(remote_groups, None)
+            stored_group = next(stored_groups, None)
+        for obj in missing:
+            counts["compared"] += 1
+            counts[DriftKind.MISSING] += 1
+            yield Drift(DriftKind.MISSING, obj.pk, {})
+        for obj in extra:
+            counts["compared"] += 1
+            counts[DriftKind.EXTRA] += 1
+            yield Drift(DriftKind.EXTRA, obj.pk, {})
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Sent by djrazorpay_sync_models with ``stats``, a djrazorpay.stats.SyncStats
+# that keeps being updated for the rest of the run.
+sync_started = Signal()
+# Sent after each batch is written, with ``entity`` (a SyncEntity) and ``stats``.
+sync_batch_written = Signal()
+# Sent once the run is over, successful or not, with ``stats``.
+sync_finished = Signal()
@@ -0,0 +1,149 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+# Upper bounds, in seconds, of the API latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+
+    def add(self, data: dict[str, Any]) -> None:
+        """Add the observations of another histogram's ``as_dict()``."""
+        for index, count in enumerate(data["buckets"].values()):
+            self.counts[index] += count
+        self.total += data["total_seconds"]
+
+    def as_dict(self) -> dict[str, Any]:
+        labels = [f"<={bound}" for bound in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": sum(self.counts),
+            "total_seconds": round(self.total, 3),
+        }
+
+
+class SyncStats:
+    """
+    Counters and timers of one sync run.
+
+    Phases are timed on the thread that runs them: ``fetch`` is time spent
+    waiting for API data, ``transform`` building model rows from payloads and
+    ``write`` in database writes. API calls can come from worker threads, so
+    they are recorded under a lock.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+        self.phases: dict[str, float] = defaultdict(float)
+        self.api_calls = 0
+        self.api_errors = 0
+        self.api_retries = 0
+        self.api_latency = LatencyHistogram()
+        self.queries = 0
+        self.rows: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"inserted": 0, "updated": 0, "unchanged": 0}
+        )
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] += time.perf_counter() - start
+
+    def timed(self, iterable: Iterable[T], phase: str) -> Iterator[T]:
+        """Yield from ``iterable``, timing the wait for each item as ``phase``."""
+        iterator = iter(iterable)
+        while True:
+            with self.timer(phase):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record_api_call(self, seconds: float, failed: bool = False) -> None:
+        with self.lock:
+            self.api_calls += 1
+            self.api_errors += failed
+            self.api_latency.observe(seconds)
+
+    def record_api_retry(self) -> None:
+        with self.lock:
+            self.api_retries += 1
+
+    def record_rows(
+        self, entity: str, inserted: int = 0, updated: int = 0, unchanged: int = 0
+    ) -> None:
+        counts = self.rows[entity]
+        counts["inserted"] += inserted
+        counts["updated"] += updated
+        counts["unchanged"] += unchanged
+
+    def total_rows(self, entity: str | None = None) -> int:
+        entities = [entity] if entity else list(self.rows)
+        return sum(sum(self.rows[name].values()) for name in entities)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def add(self, data: dict[str, Any]) -> None:
+        """
+        Add the counters and phase timings of another run's ``as_dict()``, e.g.
+        one from a worker process. Wall time is not added.
+        """
+        with self.lock:
+            for phase, seconds in data["phases"].items():
+                self.phases[phase] += seconds
+            self.api_calls += data["api_calls"]
+            self.api_errors += data["api_errors"]
+            self.api_retries += data["api_retries"]
+            self.api_latency.add(data["api_latency"])
+            self.queries += data["queries"]
+        for entity, rows in data["rows"].items():
+            self.record_rows(entity, **rows)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "seconds": round(self.elapsed, 3),
+            "phases": {name: round(value, 3) for name, value in self.phases.items()},
+            "api_calls": self.api_calls,
+            "api_errors": self.api_errors,
+            "api_retries": self.api_retries,
+            "api_latency": self.api_latency.as_dict(),
+            "queries": self.queries,
+            "rows": dict(self.rows),
+        }
+
+    @contextmanager
+    def count_queries(self, connection) -> Iterator[None]:
+        """Count the queries run on ``connection`` while the block runs."""
+
+        def wrapper(execute, sql, params, many, context):
+            self.queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            yield
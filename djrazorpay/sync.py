@@ -0,0 +1,333 @@
+from contextlib import AbstractContextManager, nullcontext
+from datetime import datetime
+
+import razorpay
+from django.core.management.base import OutputWrapper
+from django.db import models, transaction
+from django.utils import timezone
+
+from djrazorpay.cache import entitlement_cache
+from djrazorpay.enums import SyncEntity
+from djrazorpay.metrics import record_subscription_changes
+from djrazorpay.models import (
+    Account,
+    Customer,
+    Invoice,
+    Order,
+    Payment,
+    Plan,
+    PlanItem,
+    Subscription,
+)
+from djrazorpay.notes import index_notes
+from djrazorpay.stats import SyncStats
+
+
+class EntityWriter:
+    """
+    Converts Razorpay entity payloads into model rows and bulk upserts them,
+    one transaction per batch. Rows whose payload fingerprint matches the
+    stored one are skipped. Shared by the sync command and webhook event
+    processing.
+
+    ``rzp`` is used to fetch plans that subscriptions reference but that do
+    not exist locally yet; without it such subscriptions are skipped. Per-row
+    messages are written to ``stdout`` if given, and timings and row counts
+    are recorded in ``stats`` if given. Rows are linked to ``account`` if
+    given; otherwise the account of existing rows is left alone.
+
+    Each row records in ``observed_at`` when Razorpay reported the state it was
+    written from, and payloads older than that are skipped, so late or
+    redelivered webhook events cannot undo newer state. Rows a sync finds
+    unchanged keep the time they were last written.
+    """
+
+    # Models of the entities written by ``write_rows``.
+    row_models = {
+        SyncEntity.CUSTOMER: Customer,
+        SyncEntity.ORDER: Order,
+        SyncEntity.PAYMENT: Payment,
+        SyncEntity.INVOICE: Invoice,
+    }
+    # Models whose notes are indexed for ``by_note``.
+    notes_models = (Plan, Customer, Subscription, Order, Payment, Invoice)
+
+    def __init__(
+        self,
+        rzp: razorpay.Client | None = None,
+        stdout: OutputWrapper | None = None,
+        stderr: OutputWrapper | None = None,
+        stats: SyncStats | None = None,
+        account: Account | None = None,
+    ) -> None:
+        self.rzp = rzp
+        self.account = account
+        self.stdout = stdout
+        self.stderr = stderr
+        self.stats = stats
+        # Row ID -> when Razorpay reported the payload being written.
+        self.observed_at: dict[str, datetime] = {}
+
+    def log(self, message: str) -> None:
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def warn(self, message: str) -> None:
+        if self.stderr is not None:
+            self.stderr.write(message)
+
+    def timer(self, phase: str) -> AbstractContextManager:
+        return self.stats.timer(phase) if self.stats else nullcontext()
+
+    def upsert(
+        self,
+        model: type[models.Model],
+        objs: list[models.Model],
+        entity: SyncEntity | None = None,
+        tracked: tuple[str, ...] = (),
+    ) -> list[tuple[models.Model, dict | None]]:
+        """
+        Upsert the ``objs`` whose fingerprint differs from the stored row,
+        counting them under ``entity`` in ``stats`` if given. The stored
+        fingerprints of the whole batch are read with one query; objects
+        without a fingerprint are always written. Objects observed before the
+        stored row are not written and count as unchanged.
+
+        Return the written objects that are new or whose ``tracked`` attributes
+        changed, each with the stored values of those attributes (``None`` for
+        new rows). With ``tracked``, the stored rows are locked, so call it in
+        a transaction.
+        """
+        rows = model.objects.filter(pk__in=[obj.pk for obj in objs])
+        if tracked:
+            # Lock the rows, in a consistent order, until the caller's
+            # transaction commits, so concurrent writers do not derive changes
+            # from the same stored values.
+            rows = rows.select_for_update().order_by("pk")
+        stored = {
+            pk: values
+            for pk, *values in rows.values_list(
+                "pk", "fingerprint", "account_id", "observed_at", *tracked
+            )
+        }
+        now = timezone.now()
+        for obj in objs:
+            obj.observed_at = self.observed_at.get(obj.pk, now)
+            if self.account is not None:
+                obj.account_id = self.account.pk
+        stale = {
+            obj.pk
+            for obj in objs
+            if obj.pk in stored
+            and stored[obj.pk][2] is not None
+            and obj.observed_at < stored[obj.pk][2]
+        }
+        for pk in sorted(stale):
+            self.log(f"Skip {model._meta.verbose_name} {pk}: stored state is newer")
+        changed = [
+            obj
+            for obj in objs
+            if obj.pk not in stale
+            and (
+                obj.fingerprint is None
+                or obj.pk not in stored
+                or stored[obj.pk][0] != obj.fingerprint
+                or (self.account is not None and stored[obj.pk][1] != obj.account_id)
+            )
+        ]
+        if self.stats and entity:
+            inserted = sum(obj.pk not in stored for obj in changed)
+            self.stats.record_rows(
+                entity,
+                inserted=inserted,
+                updated=len(changed) - inserted,
+                unchanged=len(objs) - len(changed),
+            )
+        if changed:
+            model.objects.bulk_upsert(
+                changed, exclude=() if self.account else ("account",)
+            )
+            if model in self.notes_models:
+                index_notes(model, changed)
+        changes = []
+        for obj in changed if tracked else []:
+            if obj.pk not in stored:
+                changes.append((obj, None))
+                continue
+            values = dict(zip(tracked, stored[obj.pk][3:]))
+            if any(getattr(obj, name) != value for name, value in values.items()):
+                changes.append((obj, values))
+        return changes
+
+    def write(
+        self,
+        entity: SyncEntity,
+        batch: list[dict],
+        observed_at: list[datetime] | None = None,
+    ) -> dict[str, str]:
+        """
+        Write a batch of ``entity`` payloads, reported by Razorpay at the
+        matching times of ``observed_at`` (default: now). Return the IDs of the
+        payloads that could not be written, with the reason.
+        """
+        now = timezone.now()
+        # Upserting the same row twice in one statement is an error on
+        # PostgreSQL, so only the most recent payload per ID is kept.
+        latest: dict[str, tuple[datetime, dict]] = {}
+        for data, at in zip(batch, observed_at or [now] * len(batch)):
+            if data["id"] not in latest or at >= latest[data["id"]][0]:
+                latest[data["id"]] = (at, data)
+        self.observed_at = {pk: at for pk, (at, _) in latest.items()}
+        batch = [data for _, data in latest.values()]
+        if entity == SyncEntity.PLAN:
+            self.write_plans(batch)
+        elif entity == SyncEntity.SUBSCRIPTION:
+            return self.write_subscriptions(batch)
+        elif entity in self.row_models:
+            self.write_rows(entity, batch)
+        else:
+            raise ValueError(f"Unsupported entity {entity!r}")
+        return {}
+
+    def write_plans(self, batch: list[dict]) -> None:
+        with self.timer("transform"):
+            items, plans = [], []
+            for plan_data in batch:
+                item, plan = self.build_plan(plan_data)
+                self.log(f"Sync plan {item.id}")
+                if plan.pk in self.observed_at:
+                    # Items are only reported as part of their plan.
+                    self.observed_at[item.pk] = self.observed_at[plan.pk]
+                items.append(item)
+                plans.append(plan)
+        with self.timer("write"), transaction.atomic():
+            self.upsert(PlanItem, items)
+            self.upsert(Plan, plans, SyncEntity.PLAN)
+
+    def build_plan(self, plan_data: dict) -> tuple[PlanItem, Plan]:
+        return PlanItem.from_razorpay(plan_data["item"]), Plan.from_razorpay(plan_data)
+
+    def write_rows(self, entity: SyncEntity, batch: list[dict]) -> None:
+        """Write entities that map to a single model without lookups."""
+        model = self.row_models[entity]
+        with self.timer("transform"):
+            objs = []
+            for data in batch:
+                self.log(f"Sync {entity.value} {data['id']}")
+                objs.append(model.from_razorpay(data))
+        with self.timer("write"), transaction.atomic():
+            self.upsert(model, objs, entity)
+
+    def write_subscriptions(self, batch: list[dict]) -> dict[str, str]:
+        plan_ids, customer_ids = self.existing_references(batch)
+        missing_plans = self.fetch_missing_plans(batch, plan_ids)
+        skipped = {
+            data["id"]: f"plan {data['plan_id']} not found"
+            for data in batch
+            if data["plan_id"] not in plan_ids
+        }
+        for subscription_id, reason in skipped.items():
+            self.warn(f"Skip subscription {subscription_id}: {reason}")
+        with self.timer("transform"):
+            subscriptions = self.build_subscriptions(
+                [data for data in batch if data["id"] not in skipped], customer_ids
+            )
+        with self.timer("write"), transaction.atomic():
+            if missing_plans:
+                self.upsert(PlanItem, [item for item, _ in missing_plans])
+                self.upsert(Plan, [plan for _, plan in missing_plans], SyncEntity.PLAN)
+            changes = self.upsert(
+                Subscription,
+                subscriptions,
+                SyncEntity.SUBSCRIPTION,
+                tuple(
+                    dict.fromkeys(
+                        Subscription.entitlement_fields + Subscription.metrics_fields
+                    )
+                ),
+            )
+            self.invalidate_entitlements(changes)
+            record_subscription_changes(changes)
+        return skipped
+
+    def invalidate_entitlements(
+        self, changes: list[tuple[Subscription, dict | None]]
+    ) -> None:
+        """
+        Drop the cached entitlements of the customers of ``changes``, old and
+        new, once the transaction commits so no reader caches the old rows.
+        """
+        customer_ids = set()
+        for subscription, stored in changes:
+            if stored is not None and all(
+                getattr(subscription, name) == stored[name]
+                for name in Subscription.entitlement_fields
+            ):
+                continue
+            customer_ids.add(subscription.customer_id)
+            if stored is not None:
+                customer_ids.add(stored["customer_id"])
+        customer_ids.discard(None)
+        if customer_ids:
+            transaction.on_commit(lambda: entitlement_cache.invalidate(customer_ids))
+
+    def existing_references(self, batch: list[dict]) -> tuple[set[str], set[str]]:
+        """
+        The IDs of the plans and customers referenced by ``batch`` that exist
+        locally. Plans and customers are keyed by their Razorpay ID, so the ID
+        on the subscription payload is the foreign key value; all that is
+        needed is to know which of them are stored.
+        """
+        plan_ids = {data["plan_id"] for data in batch}
+        customer_ids = {
+            data["customer_id"] for data in batch if data.get("customer_id")
+        }
+        return (
+            set(Plan.objects.filter(pk__in=plan_ids).values_list("pk", flat=True)),
+            set(
+                Customer.objects.filter(pk__in=customer_ids).values_list(
+                    "pk", flat=True
+                )
+            ),
+        )
+
+    def build_subscriptions(
+        self, batch: list[dict], customer_ids: set[str]
+    ) -> list[Subscription]:
+        subscriptions = []
+        for subscription_data in batch:
+            self.log(f"Sync subscription {subscription_data['id']}")
+            subscription = Subscription.from_razorpay(subscription_data)
+            if (
+                subscription.customer_id is not None
+                and subscription.customer_id not in customer_ids
+            ):
+                # Not fingerprinted, so the row is rewritten until the
+                # customer is synced and the reference can be stored.
+                subscription.customer_id = None
+                subscription.fingerprint = None
+            subscriptions.append(subscription)
+        return subscriptions
+
+    def fetch_missing_plans(
+        self, batch: list[dict], plan_ids: set[str]
+    ) -> list[tuple[PlanItem, Plan]]:
+        """
+        Fetch the plans referenced by ``batch`` that are not in ``plan_ids``,
+        e.g. plans created after the plans were synced. Fetched plans are added
+        to ``plan_ids``; plans Razorpay cannot return are left out of it.
+        """
+        missing = {data["plan_id"] for data in batch} - plan_ids
+        if self.rzp is None:
+            return []
+        fetched = []
+        for plan_id in sorted(missing):
+            try:
+                plan_data = self.rzp.plan.fetch(plan_id)
+            except razorpay.errors.BadRequestError as exc:
+                self.warn(f"Unable to fetch plan {plan_id}: {exc}")
+                continue
+            self.log(f"Sync plan {plan_data['item']['id']}")
+            fetched.append(self.build_plan(plan_data))
+            plan_ids.add(plan_id)
+        return fetched
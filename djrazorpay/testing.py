@@ -0,0 +1,307 @@
+"""
+An in-process stand-in for ``razorpay.Client`` serving synthetic accounts.
+
+Collections are generated from the entity index on demand instead of being
+stored, so accounts with millions of subscriptions cost no memory. The list
+endpoints honour ``count``/``skip``/``from``/``to`` like the real API and list
+newest first; ``latency`` and ``rate_limit_ratio`` simulate a slow or
+throttling API.
+"""
+
+import random
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import razorpay
+import requests
+
+from djrazorpay.api import MAX_PAGE_SIZE
+
+# Entities of every collection are created one second apart from here on.
+BASE_CREATED_AT = 1700000000
+DEFAULT_PAGE_SIZE = 10
+
+
+class FakeCollection:
+    """
+    ``size`` entities built by ``factory(index)``, with entity ``i`` created at
+    ``BASE_CREATED_AT + i``. ``update`` overrides fields of single entities.
+    """
+
+    def __init__(
+        self,
+        client: "FakeClient",
+        prefix: str,
+        size: int,
+        factory: Callable[[int], dict],
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.size = size
+        self.factory = factory
+        self.overrides: dict[int, dict] = {}
+
+    def entity_id(self, index: int) -> str:
+        return f"{self.prefix}_{self.client.namespace}{index:08d}"
+
+    def build(self, index: int) -> dict:
+        data = self.factory(index)
+        data.update(self.overrides.get(index, {}))
+        return data
+
+    def update(self, entity_id: str, **fields: Any) -> None:
+        self.overrides.setdefault(self.index(entity_id), {}).update(fields)
+
+    def index(self, entity_id: str) -> int:
+        prefix, _, index = entity_id.rpartition("_")
+        namespace, index = index[:-8], index[-8:]
+        if (
+            prefix != self.prefix
+            or namespace != self.client.namespace
+            or not index.isdigit()
+            or int(index) >= self.size
+        ):
+            raise razorpay.errors.BadRequestError("The id provided does not exist")
+        return int(index)
+
+    def all(self, data: dict | None = None, **kwargs: Any) -> dict:
+        data = data or {}
+        self.client.request()
+        count = min(int(data.get("count", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        skip = int(data.get("skip", 0))
+        lowest = max(0, int(data.get("from", BASE_CREATED_AT)) - BASE_CREATED_AT)
+        highest = min(
+            self.size - 1,
+            int(data.get("to", BASE_CREATED_AT + self.size)) - BASE_CREATED_AT,
+        )
+        start = highest - skip
+        items = [
+            self.build(index)
+            for index in range(start, max(start - count, lowest - 1), -1)
+        ]
+        return {"entity": "collection", "count": len(items), "items": items}
+
+    def fetch(self, entity_id: str, data: dict | None = None, **kwargs: Any) -> dict:
+        self.client.request()
+        return self.build(self.index(entity_id))
+
+
+class FakeClient:
+    """
+    Drop-in for ``razorpay.Client`` exposing ``plan``, ``customer``,
+    ``subscription``, ``order``, ``payment`` and ``invoice`` collections.
+    Subscription ``i`` belongs to plan ``i % plans`` and customer
+    ``i % customers``; payment and invoice ``i`` are for order ``i % orders``.
+    Entity IDs are prefixed with ``namespace``, so clients with different
+    namespaces act as separate accounts.
+    """
+
+    def __init__(
+        self,
+        plans: int = 10,
+        customers: int = 100,
+        subscriptions: int = 1000,
+        orders: int = 0,
+        payments: int = 0,
+        invoices: int = 0,
+        latency: float = 0.0,
+        rate_limit_ratio: float = 0.0,
+        seed: int = 0,
+        namespace: str = "",
+    ) -> None:
+        self.namespace = namespace
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        # Like razorpay.Client's, so ApiClient can hook in to read responses.
+        self.session = requests.Session()
+        self.plan = FakeCollection(self, "plan", plans, self.make_plan)
+        self.customer = FakeCollection(self, "cust", customers, self.make_customer)
+        self.subscription = FakeCollection(
+            self, "sub", subscriptions, self.make_subscription
+        )
+        self.order = FakeCollection(self, "order", orders, self.make_order)
+        self.payment = FakeCollection(self, "pay", payments, self.make_payment)
+        self.invoice = FakeCollection(self, "inv", invoices, self.make_invoice)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> "FakeClient":
+        """Return self, so the client can stand in for ``razorpay.Client``."""
+        return self
+
+    def request(self) -> None:
+        """Account for one API call, applying the simulated latency and 429s."""
+        with self.lock:
+            self.calls += 1
+            throttled = self.random.random() < self.rate_limit_ratio
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            # razorpay.Client raises without the response; its status only
+            # reaches the session's response hooks.
+            response = requests.Response()
+            response.status_code = 429
+            requests.hooks.dispatch_hook("response", self.session.hooks, response)
+            raise razorpay.errors.BadRequestError("Too many requests")
+
+    def make_plan(self, index: int) -> dict:
+        created_at = BASE_CREATED_AT + index
+        return {
+            "id": self.plan.entity_id(index),
+            "entity": "plan",
+            "interval": 1,
+            "period": "monthly",
+            "item": {
+                "id": f"item_{self.namespace}{index:08d}",
+                "active": True,
+                "name": f"Plan {index}",
+                "description": "",
+                "amount": 49900 + index,
+                "unit_amount": 49900 + index,
+                "currency": "INR",
+                "type": "plan",
+                "unit": None,
+                "tax_inclusive": False,
+                "hsn_code": None,
+                "sac_code": None,
+                "tax_rate": None,
+                "tax_id": None,
+                "tax_group_id": None,
+                "created_at": created_at,
+                "updated_at": created_at,
+            },
+            "notes": {"tier": str(index)},
+            "created_at": created_at,
+        }
+
+    def make_customer(self, index: int) -> dict:
+        return {
+            "id": self.customer.entity_id(index),
+            "entity": "customer",
+            "name": f"Customer {index}",
+            "email": f"customer{index}@example.com",
+            "contact": f"9{index:09d}",
+            "gstin": None,
+            "notes": {"user_id": str(index)},
+            "created_at": BASE_CREATED_AT + index,
+        }
+
+    def make_subscription(self, index: int) -> dict:
+        created_at = BASE_CREATED_AT + index
+        period = 30 * 86400
+        return {
+            "id": self.subscription.entity_id(index),
+            "entity": "subscription",
+            "plan_id": self.plan.entity_id(index % self.plan.size),
+            "customer_id": self.customer.entity_id(index % self.customer.size),
+            "status": "active",
+            "current_start": created_at,
+            "current_end": created_at + period,
+            "ended_at": None,
+            "quantity": 1,
+            "notes": {"user_id": str(index % self.customer.size)},
+            "charge_at": created_at + period,
+            "start_at": created_at,
+            "end_at": created_at + 12 * period,
+            "auth_attempts": 0,
+            "total_count": 12,
+            "paid_count": 1,
+            "customer_notify": True,
+            "created_at": created_at,
+            "expire_by": None,
+            "short_url": f"https://rzp.io/i/{index}",
+            "has_scheduled_changes": False,
+            "change_scheduled_at": None,
+            "source": "api",
+            "offer_id": None,
+            "remaining_count": 11,
+        }
+
+    def order_id(self, index: int) -> str | None:
+        return (
+            self.order.entity_id(index % self.order.size) if self.order.size else None
+        )
+
+    def customer_id(self, index: int) -> str | None:
+        if not self.customer.size:
+            return None
+        return self.customer.entity_id(index % self.customer.size)
+
+    def make_order(self, index: int) -> dict:
+        amount = 49900 + index
+        return {
+            "id": self.order.entity_id(index),
+            "entity": "order",
+            "amount": amount,
+            "amount_paid": amount,
+            "amount_due": 0,
+            "currency": "INR",
+            "receipt": f"receipt#{index}",
+            "offer_id": None,
+            "status": "paid",
+            "attempts": 1,
+            "notes": [],
+            "created_at": BASE_CREATED_AT + index,
+        }
+
+    def make_payment(self, index: int) -> dict:
+        captured = index % 10 != 0
+        return {
+            "id": self.payment.entity_id(index),
+            "entity": "payment",
+            "amount": 49900 + index,
+            "currency": "INR",
+            "status": "captured" if captured else "failed",
+            "order_id": self.order_id(index),
+            "invoice_id": None,
+            "international": False,
+            "method": "upi",
+            "amount_refunded": 0,
+            "refund_status": None,
+            "captured": captured,
+            "description": None,
+            "card_id": None,
+            "bank": None,
+            "wallet": None,
+            "vpa": f"customer{index}@upi",
+            "email": f"customer{index}@example.com",
+            "contact": f"+919{index:09d}",
+            "customer_id": self.customer_id(index),
+            "notes": {"user_id": str(index)},
+            "fee": 1180 if captured else None,
+            "tax": 180 if captured else None,
+            "error_code": None if captured else "BAD_REQUEST_ERROR",
+            "error_description": None if captured else "Payment failed",
+            "created_at": BASE_CREATED_AT + index,
+        }
+
+    def make_invoice(self, index: int) -> dict:
+        created_at = BASE_CREATED_AT + index
+        amount = 49900 + index
+        return {
+            "id": self.invoice.entity_id(index),
+            "entity": "invoice",
+            "type": "invoice",
+            "invoice_number": f"INV-{index}",
+            "customer_id": self.customer_id(index),
+            "order_id": self.order_id(index),
+            "subscription_id": None,
+            "payment_id": None,
+            "status": "issued",
+            "amount": amount,
+            "amount_paid": 0,
+            "amount_due": amount,
+            "currency": "INR",
+            "description": None,
+            "short_url": f"https://rzp.io/i/inv{index}",
+            "date": created_at,
+            "issued_at": created_at,
+            "paid_at": None,
+            "cancelled_at": None,
+            "expired_at": None,
+            "notes": [],
+            "created_at": created_at,
+        }
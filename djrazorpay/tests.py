@@ -1,3 +1,932 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import hmac
+import io
+import json
+import os
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import razorpay
+import requests
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from djrazorpay.management.commands import (
+    djrazorpay_index_notes,
+    djrazorpay_process_events,
+    djrazorpay_reconcile,
+    djrazorpay_sync_models,
+)
+from djrazorpay.api import AdaptiveConcurrency, ApiClient
+from djrazorpay.cache import entitlement_cache
+from djrazorpay.enums import DriftKind, SubscriptionStatus, SyncEntity
+from djrazorpay.mapping import Notes
+from djrazorpay.metrics import monthly_amount
+from djrazorpay.models import (
+    Account,
+    Customer,
+    IndexedNote,
+    Invoice,
+    Order,
+    Payment,
+    Plan,
+    PlanItem,
+    RazorpayQuerySet,
+    Subscription,
+    SubscriptionMetrics,
+    SyncCheckpoint,
+    SyncCursor,
+    WebhookEvent,
+)
+from djrazorpay.reconcile import Drift, diff
+from djrazorpay.signals import sync_finished
+from djrazorpay.sync import EntityWriter
+from djrazorpay.testing import BASE_CREATED_AT, FakeClient
+
+WEBHOOK_SECRET = "whsec_test"
+
+
+def sync(client: FakeClient, *args: str) -> str:
+    command = djrazorpay_sync_models.Command()
+    command.client_class = client
+    stdout = io.StringIO()
+    call_command(command, "key", "secret", *args, stdout=stdout, stderr=io.StringIO())
+    return stdout.getvalue()
+
+
+class FakeClientTests(TestCase):
+    def test_pages_newest_first(self):
+        client = FakeClient(subscriptions=25)
+        page = client.subscription.all({"count": 10, "skip": 20})
+        self.assertEqual(
+            [item["id"] for item in page["items"]],
+            [f"sub_{index:08d}" for index in range(4, -1, -1)],
+        )
+
+    def test_from_to_filters(self):
+        client = FakeClient(subscriptions=25)
+        page = client.subscription.all(
+            {"from": BASE_CREATED_AT + 5, "to": BASE_CREATED_AT + 7}
+        )
+        self.assertEqual(
+            [item["created_at"] - BASE_CREATED_AT for item in page["items"]],
+            [7, 6, 5],
+        )
+
+
+class ApiClientTests(TestCase):
+    def test_aimd_concurrency(self):
+        concurrency = AdaptiveConcurrency(initial=4, minimum=1, maximum=5)
+        concurrency.throttled()
+        self.assertEqual(concurrency.limit, 2)
+        concurrency.throttled()
+        concurrency.throttled()
+        self.assertEqual(concurrency.limit, 1)
+        for _ in range(10):
+            concurrency.succeeded()
+        self.assertEqual(int(concurrency.limit), 4)
+        for _ in range(100):
+            concurrency.succeeded()
+        self.assertEqual(concurrency.limit, 5)
+
+    def test_honours_retry_after(self):
+        api = ApiClient(FakeClient())
+        attempts = []
+
+        def throttled_once():
+            attempts.append(1)
+            if len(attempts) == 1:
+                api.local.response = requests.Response()
+                api.local.response.status_code = 429
+                api.local.response.headers["Retry-After"] = "7"
+                raise razorpay.errors.BadRequestError("Rate limit exceeded")
+            return {"items": []}
+
+        with mock.patch("djrazorpay.api.time.sleep") as sleep:
+            self.assertEqual(api.call(throttled_once), {"items": []})
+        sleep.assert_called_once_with(7.0)
+        self.assertEqual(api.concurrency.limit, 2.5)
+
+    @override_settings(DJRAZORPAY_API={"MAX_RETRIES": 0})
+    def test_reads_status_from_session(self):
+        api = ApiClient(FakeClient(plans=1, rate_limit_ratio=1))
+        with self.assertRaises(razorpay.errors.BadRequestError):
+            api.plan.fetch("plan_00000000")
+        self.assertEqual(api.status_code(), 429)
+        self.assertEqual(api.concurrency.limit, 2)
+
+    def test_does_not_retry_bad_requests(self):
+        api = ApiClient(FakeClient(plans=1))
+        with self.assertRaises(razorpay.errors.BadRequestError):
+            api.plan.fetch("plan_00000001")
+
+    @override_settings(DJRAZORPAY_API={"BACKOFF_BASE": 0.001, "MAX_RETRIES": 10})
+    def test_sync_survives_rate_limiting(self):
+        client = FakeClient(
+            plans=3, customers=7, subscriptions=400, rate_limit_ratio=0.3
+        )
+        received = []
+
+        def receiver(stats, **kwargs):
+            received.append(stats)
+
+        sync_finished.connect(receiver)
+        try:
+            sync(client, "--workers", "4")
+        finally:
+            sync_finished.disconnect(receiver)
+        self.assertEqual(Subscription.objects.count(), 400)
+        stats = received[0]
+        self.assertGreater(stats.api_retries, 0)
+        self.assertEqual(stats.api_retries, stats.api_errors)
+
+
+class MappingTests(TestCase):
+    def test_plan_item_from_razorpay(self):
+        data = FakeClient().plan.fetch("plan_00000003")["item"]
+        data["amount"] = 123456789
+        item = PlanItem.from_razorpay(data)
+        self.assertEqual(item.amount, Decimal("1234567.89"))
+        self.assertEqual(item.unit_amount, Decimal("499.03"))
+        self.assertEqual(
+            item.created_at,
+            datetime.datetime(2023, 11, 14, 22, 13, 23, tzinfo=datetime.timezone.utc),
+        )
+        self.assertIsNone(item.tax_rate)
+
+    def test_nested_keys_and_nullable_fields(self):
+        data = FakeClient().subscription.fetch("sub_00000001")
+        del data["customer_id"], data["ended_at"]
+        subscription = Subscription.from_razorpay(data)
+        self.assertIsNone(subscription.customer_id)
+        self.assertIsNone(subscription.ended_at)
+        plan = Plan.from_razorpay(FakeClient().plan.fetch("plan_00000001"))
+        self.assertEqual(plan.item_id, "item_00000001")
+        with self.assertRaises(KeyError):
+            Plan.from_razorpay({"id": "plan_1"})
+
+    def test_empty_notes(self):
+        self.assertEqual(Notes().convert([]), {})
+        self.assertEqual(Notes().convert({"a": "b"}), {"a": "b"})
+
+
+class SyncModelsTests(TestCase):
+    def test_sync_all_pages(self):
+        client = FakeClient(plans=3, customers=7, subscriptions=250)
+        sync(client, "--batch-size", "40")
+        self.assertEqual(Plan.objects.count(), 3)
+        self.assertEqual(Customer.objects.count(), 7)
+        self.assertEqual(Subscription.objects.count(), 250)
+        subscription = Subscription.objects.get(id="sub_00000010")
+        self.assertEqual(subscription.plan_id, "plan_00000001")
+        self.assertEqual(subscription.customer_id, "cust_00000003")
+        self.assertEqual(
+            Plan.objects.get(id="plan_00000002").item.amount, Decimal("499.02")
+        )
+
+    def test_resync_updates_rows(self):
+        client = FakeClient(plans=1, customers=1, subscriptions=5)
+        sync(client)
+        client.subscription.update("sub_00000003", status="halted")
+        sync(client)
+        self.assertEqual(Subscription.objects.get(id="sub_00000003").status, "halted")
+
+    def test_unchanged_rows_not_rewritten(self):
+        client = FakeClient(plans=1, customers=2, subscriptions=5)
+        sync(client)
+        Subscription.objects.update(status="halted")
+        Subscription.objects.filter(id="sub_00000001").update(fingerprint=None)
+        client.subscription.update("sub_00000002", quantity=3)
+        output = sync(client)
+        self.assertEqual(
+            dict(Subscription.objects.values_list("id", "status")),
+            {
+                "sub_00000000": "halted",
+                "sub_00000001": "active",
+                "sub_00000002": "active",
+                "sub_00000003": "halted",
+                "sub_00000004": "halted",
+            },
+        )
+        self.assertIn(
+            "subscription: 5 rows (inserted 0, updated 2, unchanged 3)", output
+        )
+
+    def test_bulk_upsert_without_conflict_target(self):
+        # As on MySQL and MariaDB, which upsert on any unique key.
+        customer = Customer.from_razorpay(FakeClient(customers=1).customer.build(0))
+        with mock.patch.object(
+            connection.features, "supports_update_conflicts_with_target", False
+        ), mock.patch.object(RazorpayQuerySet, "bulk_create") as bulk_create:
+            Customer.objects.bulk_upsert([customer])
+        self.assertIsNone(bulk_create.call_args.kwargs["unique_fields"])
+
+    def test_writer_sees_rows_stored_since_last_batch(self):
+        client = FakeClient(plans=1, customers=1, subscriptions=1)
+        writer = EntityWriter(client)
+        subscription = client.subscription.fetch("sub_00000000")
+        writer.write(SyncEntity.SUBSCRIPTION, [subscription])
+        self.assertIsNone(Subscription.objects.get().customer_id)
+        # E.g. by a concurrent sync.
+        EntityWriter().write(
+            SyncEntity.CUSTOMER, [client.customer.fetch("cust_00000000")]
+        )
+        writer.write(SyncEntity.SUBSCRIPTION, [subscription])
+        self.assertEqual(Subscription.objects.get().customer_id, "cust_00000000")
+
+    def test_concurrent_sync_matches_serial(self):
+        client = FakeClient(plans=4, customers=9, subscriptions=321)
+        sync(client, "--workers", "4", "--batch-size", "50")
+        self.assertEqual(Plan.objects.count(), 4)
+        self.assertEqual(Customer.objects.count(), 9)
+        self.assertEqual(Subscription.objects.count(), 321)
+
+    def test_incremental_fetches_new_entities_only(self):
+        client = FakeClient(plans=2, customers=2, subscriptions=30)
+        sync(client, "--incremental")
+        client.subscription.size = 35
+        calls = client.calls
+        output = sync(client, "--incremental", "--verbosity", "2")
+        self.assertEqual(Subscription.objects.count(), 35)
+        # The newest previously synced subscription is fetched again since
+        # ``from`` is inclusive.
+        self.assertEqual(output.count("Sync subscription"), 6)
+        self.assertEqual(client.calls - calls, 6)
+
+    def test_stats(self):
+        client = FakeClient(plans=2, customers=3, subscriptions=150)
+        sync(client)
+        client.subscription.size = 160
+        calls = client.calls
+        received = []
+
+        def receiver(stats, **kwargs):
+            received.append(stats)
+
+        sync_finished.connect(receiver)
+        try:
+            sync(client, "--batch-size", "100")
+        finally:
+            sync_finished.disconnect(receiver)
+        stats = received[0].as_dict()
+        self.assertEqual(
+            stats["rows"]["subscription"],
+            {"inserted": 10, "updated": 0, "unchanged": 150},
+        )
+        self.assertEqual(stats["api_calls"], client.calls - calls)
+        self.assertGreater(stats["queries"], 0)
+        self.assertEqual(set(stats["phases"]), {"fetch", "transform", "write"})
+
+    def test_resume_from_checkpoint(self):
+        client = FakeClient(plans=2, customers=3, subscriptions=450)
+        fetch_page = client.subscription.all
+
+        def fail_on_fourth_page(data=None, **kwargs):
+            if data["skip"] == 300:
+                raise razorpay.errors.BadRequestError("Connection reset")
+            return fetch_page(data, **kwargs)
+
+        with mock.patch.object(client.subscription, "all", fail_on_fourth_page):
+            with self.assertRaises(razorpay.errors.BadRequestError):
+                sync(client, "--batch-size", "100")
+        self.assertEqual(Subscription.objects.count(), 300)
+        checkpoint = SyncCheckpoint.objects.get(entity="subscription")
+        self.assertEqual((checkpoint.rows, checkpoint.completed), (300, False))
+        self.assertFalse(SyncCursor.objects.filter(entity="subscription").exists())
+
+        calls = client.calls
+        output = sync(client, "--resume", "--batch-size", "100")
+        self.assertIn(f"Resuming sync run {checkpoint.run_id}", output)
+        self.assertEqual(Subscription.objects.count(), 450)
+        # Only the remaining subscriptions, from the oldest one written on,
+        # then one empty page per entity type of the later stages.
+        self.assertEqual(client.calls - calls, 5)
+        self.assertFalse(SyncCheckpoint.objects.exists())
+        self.assertEqual(
+            SyncCursor.objects.get(entity="subscription").last_created_at,
+            datetime.datetime.fromtimestamp(
+                BASE_CREATED_AT + 449, datetime.timezone.utc
+            ),
+        )
+
+    def test_sync_orders_payments_invoices(self):
+        client = FakeClient(
+            plans=1, customers=3, subscriptions=0, orders=4, payments=25, invoices=6
+        )
+        sync(client, "--workers", "3", "--batch-size", "10")
+        self.assertEqual(Order.objects.count(), 4)
+        self.assertEqual(Payment.objects.count(), 25)
+        self.assertEqual(Invoice.objects.count(), 6)
+        payment = Payment.objects.get(id="pay_00000010")
+        self.assertEqual(
+            (payment.status, payment.order_id, payment.customer_id),
+            ("failed", "order_00000002", "cust_00000001"),
+        )
+        self.assertEqual(payment.amount, Decimal("499.10"))
+        self.assertIsNone(payment.fee)
+        self.assertEqual(Payment.objects.get(id="pay_00000011").fee, Decimal("11.80"))
+        self.assertEqual(Invoice.objects.get(id="inv_00000005").notes, {})
+
+    def test_only_given_entities(self):
+        client = FakeClient(plans=2, customers=2, subscriptions=5, payments=5)
+        sync(client, "--entities", "payment")
+        self.assertEqual(Payment.objects.count(), 5)
+        self.assertFalse(Plan.objects.exists())
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_time_budget(self):
+        client = FakeClient(plans=1, customers=1, subscriptions=0, payments=120)
+        output = sync(
+            client, "--entities", "payment", "--batch-size", "50", "--time-budget", "0"
+        )
+        self.assertIn("Time budget used up", output)
+        self.assertEqual(Payment.objects.count(), 50)
+        self.assertEqual(SyncCheckpoint.objects.get().rows, 50)
+        while "Time budget used up" in output:
+            output = sync(
+                client, "--resume", "--batch-size", "50", "--time-budget", "0"
+            )
+        self.assertEqual(Payment.objects.count(), 120)
+        self.assertFalse(SyncCheckpoint.objects.exists())
+        self.assertTrue(SyncCursor.objects.filter(entity="payment").exists())
+
+    def test_missing_plan_fetched_on_demand(self):
+        client = FakeClient(plans=3, customers=1, subscriptions=6)
+        sync(client, "--incremental")
+        Plan.objects.filter(id="plan_00000000").delete()
+        client.subscription.size = 9
+        sync(client, "--incremental")
+        self.assertTrue(Plan.objects.filter(id="plan_00000000").exists())
+        self.assertEqual(
+            Subscription.objects.get(id="sub_00000006").plan_id, "plan_00000000"
+        )
+
+
+class EntitlementTests(TestCase):
+    def setUp(self):
+        entitlement_cache.clear_local()
+        cache.clear()
+
+    def test_cached_until_subscription_changes(self):
+        client = FakeClient(plans=2, customers=2, subscriptions=4)
+        sync(client)
+        self.assertTrue(
+            Subscription.objects.is_entitled("cust_00000000", "plan_00000000")
+        )
+        self.assertFalse(
+            Subscription.objects.is_entitled("cust_00000000", "plan_00000001")
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                Subscription.objects.is_entitled("cust_00000000", "plan_00000000")
+            )
+        entitlement_cache.clear_local()
+        with self.assertNumQueries(0):
+            Subscription.objects.is_entitled("cust_00000000", "plan_00000000")
+
+        client.subscription.update("sub_00000000", status="cancelled")
+        client.subscription.update("sub_00000002", ended_at=BASE_CREATED_AT + 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            sync(client)
+        self.assertFalse(
+            Subscription.objects.is_entitled("cust_00000000", "plan_00000000")
+        )
+        self.assertEqual(
+            Subscription.objects.entitled_plan_ids("cust_00000001"),
+            {"plan_00000001"},
+        )
+
+    def test_entitlements_only_on_manager(self):
+        sync(FakeClient(plans=2, customers=2, subscriptions=4))
+        halted = Subscription.objects.filter(status="halted")
+        self.assertFalse(hasattr(halted, "is_entitled"))
+        self.assertTrue(
+            Subscription.objects.is_entitled("cust_00000000", "plan_00000000")
+        )
+
+
+class MetricsTests(TestCase):
+    def totals(self) -> list[tuple]:
+        return [
+            (row["plan_id"], row["status"], row["count"], row["mrr"])
+            for row in SubscriptionMetrics.objects.totals()
+            if row["count"]
+        ]
+
+    def test_monthly_amount(self):
+        self.assertEqual(monthly_amount(Decimal("1200"), "yearly", 1, 2), 200)
+        self.assertEqual(monthly_amount(Decimal("300"), "monthly", 3, 1), 100)
+        self.assertEqual(
+            monthly_amount(Decimal("10"), "weekly", 1, 1), Decimal("43.33")
+        )
+
+    def test_kept_up_to_date_by_sync(self):
+        client = FakeClient(plans=2, customers=3, subscriptions=10)
+        sync(client)
+        self.assertEqual(
+            self.totals(),
+            [
+                ("plan_00000000", "active", 5, Decimal("2495.00")),
+                ("plan_00000001", "active", 5, Decimal("2495.05")),
+            ],
+        )
+        client.subscription.update(
+            "sub_00000000", status="cancelled", ended_at=int(time.time())
+        )
+        client.subscription.update("sub_00000001", quantity=3)
+        client.subscription.update("sub_00000003", paid_count=2)
+        sync(client)
+        expected = [
+            ("plan_00000000", "active", 4, Decimal("1996.00")),
+            ("plan_00000000", "cancelled", 1, Decimal("499.00")),
+            ("plan_00000001", "active", 5, Decimal("3493.07")),
+        ]
+        self.assertEqual(self.totals(), expected)
+        today = timezone.now().date()
+        self.assertEqual(
+            SubscriptionMetrics.objects.entered(
+                today, today, SubscriptionStatus.CANCELLED
+            ),
+            1,
+        )
+
+        output = io.StringIO()
+        call_command("djrazorpay_rebuild_metrics", stdout=output)
+        self.assertIn("Rebuilt 4 subscription metrics rows", output.getvalue())
+        self.assertEqual(self.totals(), expected)
+        # The cancellation is dated when the subscription ended, not created.
+        created = Subscription.objects.get(id="sub_00000000").created_at.date()
+        self.assertEqual(
+            SubscriptionMetrics.objects.entered(
+                today, today, SubscriptionStatus.CANCELLED
+            ),
+            1,
+        )
+        self.assertEqual(
+            SubscriptionMetrics.objects.entered(
+                created, created, SubscriptionStatus.CANCELLED
+            ),
+            0,
+        )
+        self.assertEqual(
+            SubscriptionMetrics.objects.entered(
+                created, created, SubscriptionStatus.ACTIVE
+            ),
+            10,
+        )
+
+
+class SubscriptionQuerySetTests(TestCase):
+    def test_keyset_iterator(self):
+        sync(FakeClient(plans=1, customers=1, subscriptions=8))
+        charge_at = Subscription.objects.get(id="sub_00000006").charge_at
+        Subscription.objects.filter(id__in=["sub_00000001", "sub_00000003"]).update(
+            charge_at=charge_at
+        )
+        Subscription.objects.filter(id="sub_00000004").update(charge_at=None)
+        Subscription.objects.filter(id="sub_00000005").update(status="halted")
+        subscriptions = Subscription.objects.in_status(SubscriptionStatus.ACTIVE)
+        with self.assertNumQueries(5) as queries:
+            ids = [s.id for s in subscriptions.keyset_iterator(batch_size=2)]
+        # Pages seek to the last row seen with a row value comparison.
+        self.assertIn('"charge_at", ', queries.captured_queries[1]["sql"])
+        self.assertIn('"id") > (', queries.captured_queries[1]["sql"])
+        self.assertEqual(
+            ids,
+            [
+                "sub_00000000",
+                "sub_00000002",
+                "sub_00000001",
+                "sub_00000003",
+                "sub_00000006",
+                "sub_00000007",
+                "sub_00000004",
+            ],
+        )
+        due = Subscription.objects.due_between(
+            charge_at, charge_at + datetime.timedelta(seconds=2)
+        )
+        self.assertEqual(
+            [s.id for s in due.keyset_iterator()],
+            ["sub_00000001", "sub_00000003", "sub_00000006", "sub_00000007"],
+        )
+
+
+class AccountsMixin:
+    def sync_accounts(self, *args: str) -> tuple[str, dict]:
+        clients = {
+            "key_a": FakeClient(plans=2, customers=3, subscriptions=20, namespace="a"),
+            "key_b": FakeClient(plans=1, customers=2, subscriptions=5, namespace="b"),
+            "key_c": FakeClient(plans=1, customers=1, subscriptions=1, namespace="c"),
+        }
+        for name in ("a", "b", "c"):
+            Account.objects.create(
+                name=name, api_key=f"key_{name}", secret_key="secret", active=name < "c"
+            )
+        command = djrazorpay_sync_models.Command()
+        command.client_class = lambda auth: clients[auth[0]]
+        stdout = io.StringIO()
+        received = []
+
+        def receiver(stats, **kwargs):
+            received.append(stats)
+
+        sync_finished.connect(receiver)
+        try:
+            call_command(command, "--all-accounts", *args, stdout=stdout)
+        finally:
+            sync_finished.disconnect(receiver)
+        return stdout.getvalue(), command.total_stats.as_dict()
+
+    def assert_accounts_synced(self, stats: dict) -> None:
+        self.assertEqual(stats["rows"]["subscription"]["inserted"], 25)
+        self.assertEqual(stats["rows"]["plan"]["inserted"], 3)
+        self.assertEqual(Subscription.objects.filter(account__name="a").count(), 20)
+        self.assertEqual(Customer.objects.filter(account__name="b").count(), 2)
+        self.assertFalse(Subscription.objects.filter(account__name="c").exists())
+
+
+class AccountTests(AccountsMixin, TestCase):
+    def test_all_accounts(self):
+        output, stats = self.sync_accounts()
+        self.assertIn("a: Synced 25 rows", output)
+        self.assert_accounts_synced(stats)
+        self.assertEqual(PlanItem.objects.get(id="item_b00000000").account.name, "b")
+
+    def test_all_accounts_ignores_environment_keys(self):
+        with mock.patch.dict(
+            os.environ, RAZORPAY_API_KEY="key_x", RAZORPAY_SECRET_KEY="secret"
+        ):
+            output, stats = self.sync_accounts()
+        self.assertIn("a: Synced 25 rows", output)
+
+    def test_sync_state_follows_account(self):
+        self.sync_accounts()
+        cursor = SyncCursor.objects.get(account__name="a", entity="subscription")
+        self.assertEqual(cursor.api_key, "")
+        # Syncing with the key of an account uses the account's cursors.
+        client = FakeClient(plans=2, customers=3, subscriptions=20, namespace="a")
+        sync_a = djrazorpay_sync_models.Command()
+        sync_a.client_class = client
+        call_command(sync_a, "key_a", "secret", "--incremental", stdout=io.StringIO())
+        self.assertEqual(SyncCursor.objects.filter(api_key="key_a").count(), 0)
+        # Only the subscriptions of the watermark's second are listed again.
+        self.assertEqual(sum(sync_a.stats.rows["subscription"].values()), 1)
+        # Keys without an account keep theirs by key.
+        sync(FakeClient(plans=1, customers=1, subscriptions=1))
+        self.assertEqual(
+            SyncCursor.objects.get(api_key="key", entity="subscription").account,
+            None,
+        )
+
+    def test_keys_keep_account(self):
+        self.sync_accounts()
+        sync(FakeClient(plans=1, customers=1, subscriptions=1, namespace="a"))
+        self.assertEqual(Subscription.objects.get(id="sub_a00000000").account.name, "a")
+
+
+class ProcessAccountTests(AccountsMixin, TransactionTestCase):
+    def test_all_accounts_in_processes(self):
+        output, stats = self.sync_accounts("--processes", "2")
+        self.assertIn("b: Synced 8 rows", output)
+        self.assert_accounts_synced(stats)
+
+
+class NotesTests(TestCase):
+    @override_settings(DJRAZORPAY_INDEXED_NOTES_KEYS=["user_id"])
+    def test_by_indexed_note(self):
+        client = FakeClient(plans=2, customers=3, subscriptions=7)
+        sync(client)
+        self.assertEqual(IndexedNote.objects.count(), 10)
+        self.assertEqual(
+            sorted(
+                Subscription.objects.by_note("user_id", 1).values_list("id", flat=True)
+            ),
+            ["sub_00000001", "sub_00000004"],
+        )
+        client.subscription.update("sub_00000004", notes={"user_id": "2"})
+        sync(client)
+        self.assertEqual(
+            list(
+                Subscription.objects.by_note("user_id", "1").values_list(
+                    "id", flat=True
+                )
+            ),
+            ["sub_00000001"],
+        )
+        self.assertEqual(
+            Customer.objects.by_note("user_id", 2).get().id, "cust_00000002"
+        )
+
+    def test_by_unindexed_note(self):
+        sync(FakeClient(plans=2, customers=1, subscriptions=1))
+        self.assertEqual(Plan.objects.get(id="plan_00000001").notes, {"tier": "1"})
+        self.assertEqual(Plan.objects.by_note("tier", "1").get().id, "plan_00000001")
+        # Compared as text whatever the JSON type, with "__" part of the key.
+        Plan.objects.filter(id="plan_00000001").update(notes={"tier": 5, "a__b": "c"})
+        self.assertEqual(Plan.objects.by_note("tier", 5).get().id, "plan_00000001")
+        self.assertEqual(Plan.objects.by_note("tier", "5").get().id, "plan_00000001")
+        self.assertEqual(Plan.objects.by_note("a__b", "c").get().id, "plan_00000001")
+
+    def test_index_notes_command(self):
+        sync(FakeClient(plans=1, customers=2, subscriptions=4))
+        self.assertFalse(IndexedNote.objects.exists())
+        with override_settings(DJRAZORPAY_INDEXED_NOTES_KEYS=["user_id"]):
+            call_command(djrazorpay_index_notes.Command(), stdout=io.StringIO())
+            self.assertEqual(Subscription.objects.by_note("user_id", "0").count(), 2)
+        self.assertEqual(IndexedNote.objects.count(), 6)
+
+
+class ReconcileTests(TestCase):
+    def reconcile(self, client: FakeClient, *args: str) -> str:
+        command = djrazorpay_reconcile.Command()
+        command.client_class = client
+        stdout = io.StringIO()
+        call_command(command, "key", "secret", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_no_drift(self):
+        client = FakeClient(plans=2, customers=3, subscriptions=40, payments=15)
+        sync(client)
+        output = self.reconcile(client, "--check")
+        self.assertIn("subscription: 40 compared, 0 missing, 0 extra", output)
+        self.assertIn("payment: 15 compared, 0 missing, 0 extra", output)
+
+    def test_reports_drift(self):
+        client = FakeClient(plans=1, customers=2, subscriptions=30)
+        sync(client)
+        Subscription.objects.filter(id="sub_00000004").delete()
+        client.subscription.update("sub_00000007", status="halted", quantity=2)
+        client.subscription.size = 28
+        fingerprints = Subscription.objects.values_list("fingerprint", flat=True)
+        stored = list(fingerprints)
+        with self.assertRaisesMessage(CommandError, "Found 4 differences"):
+            self.reconcile(client, "--entities", "subscription", "--check")
+        output = self.reconcile(client, "--entities", "subscription")
+        self.assertIn("missing subscription sub_00000004", output)
+        self.assertIn("extra subscription sub_00000029", output)
+        self.assertIn("extra subscription sub_00000028", output)
+        self.assertIn(
+            "mismatch subscription sub_00000007: "
+            "status 'active' != 'halted', quantity 1 != 2",
+            output,
+        )
+        self.assertNotIn("customer:", output)
+        # Nothing is written.
+        self.assertEqual(list(fingerprints), stored)
+
+    def test_reports_plan_item_drift(self):
+        client = FakeClient(plans=2, customers=1, subscriptions=1)
+        sync(client)
+        item = client.plan.fetch("plan_00000001")["item"]
+        client.plan.update("plan_00000001", item={**item, "amount": 100})
+        output = self.reconcile(client, "--entities", "plan")
+        self.assertIn(
+            "mismatch plan plan_00000001: item.amount Decimal('499.01') != "
+            "Decimal('1.00')",
+            output,
+        )
+        self.assertIn("plan: 2 compared, 0 missing, 0 extra, 1 mismatched", output)
+
+    def test_diff_matches_entities_of_the_same_second(self):
+        client = FakeClient(plans=1, customers=4, subscriptions=0)
+        remote = [client.customer.build(index) for index in range(4)]
+        for data in remote:
+            data["created_at"] = BASE_CREATED_AT
+        stored = [Customer.from_razorpay(data) for data in remote]
+        stored[2].email = "changed@example.com"
+        # Razorpay may order the entities of one second differently.
+        drifts = list(diff(Customer, reversed(remote[1:]), stored[:3]))
+        self.assertEqual(
+            drifts,
+            [
+                Drift(
+                    DriftKind.MISMATCH,
+                    "cust_00000002",
+                    {"email": ("changed@example.com", "customer2@example.com")},
+                ),
+                Drift(DriftKind.MISSING, "cust_00000003", {}),
+                Drift(DriftKind.EXTRA, "cust_00000000", {}),
+            ],
+        )
+
+
+class SnapshotTests(TestCase):
+    def test_export_import_round_trip(self):
+        client = FakeClient(
+            plans=2, customers=3, subscriptions=20, orders=4, payments=9, invoices=5
+        )
+        sync(client)
+        models = [PlanItem, Plan, Customer, Subscription, Order, Payment, Invoice]
+        before = [list(model.objects.order_by("pk").values()) for model in models]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot.ndjson.gz")
+            output = io.StringIO()
+            call_command("djrazorpay_export", path, stdout=output)
+            self.assertIn("subscription: exported 20 rows", output.getvalue())
+            for model in reversed(models):
+                model.objects.all().delete()
+            output = io.StringIO()
+            call_command("djrazorpay_import", path, "--batch-size", "7", stdout=output)
+        self.assertIn("payment: 9 rows (inserted 9, updated 0", output.getvalue())
+        after = [list(model.objects.order_by("pk").values()) for model in models]
+        for rows in before + after:
+            for row in rows:
+                # Fingerprints digest the payload, which carries more fields
+                # in the API than in the snapshot.
+                del row["fingerprint"]
+                del row["observed_at"]
+        self.assertEqual(after, before)
+
+    def test_import_rejects_malformed_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot.ndjson")
+            with open(path, "w") as fp:
+                fp.write('{"entity": "customer"\n')
+            with self.assertRaisesMessage(CommandError, "Line 1"):
+                call_command("djrazorpay_import", path, stdout=io.StringIO())
+
+
+@override_settings(DJRAZORPAY_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class WebhookTests(TestCase):
+    def event_request(
+        self,
+        event_id: str,
+        payload: dict,
+        signature: str | None = None,
+        created_at: int | None = None,
+    ) -> dict:
+        """Arguments to post an event to a webhook view with the test client."""
+        event = {"entity": "event", "payload": payload}
+        if created_at is not None:
+            event["created_at"] = created_at
+        body = json.dumps(event).encode()
+        if signature is None:
+            signature = hmac.new(
+                WEBHOOK_SECRET.encode(), body, hashlib.sha256
+            ).hexdigest()
+        return {
+            "data": body,
+            "content_type": "application/json",
+            "headers": {
+                "X-Razorpay-Event-Id": event_id,
+                "X-Razorpay-Signature": signature,
+            },
+        }
+
+    def post_event(self, *args, **kwargs):
+        return self.client.post("/webhook/", **self.event_request(*args, **kwargs))
+
+    async def apost_event(self, *args, **kwargs):
+        return await self.async_client.post(
+            "/webhook/async/", **self.event_request(*args, **kwargs)
+        )
+
+    def test_stores_event_once(self):
+        self.assertEqual(self.post_event("evt_1", {}).status_code, 200)
+        self.assertEqual(self.post_event("evt_1", {}).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_rejects_bad_signature(self):
+        response = self.post_event("evt_1", {}, signature="0" * 64)
+        self.assertEqual(response.status_code, 400)
+        response = self.post_event("evt_1", {}, signature="é" * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    async def test_async_stores_event_once(self):
+        response = await self.apost_event("evt_1", {"order": {}})
+        self.assertEqual(response.status_code, 200)
+        response = await self.apost_event("evt_1", {})
+        self.assertEqual(response.status_code, 200)
+        event = await WebhookEvent.objects.aget()
+        self.assertEqual(event.id, "evt_1")
+        self.assertEqual(json.loads(event.body)["payload"], {"order": {}})
+
+    async def test_async_rejects_bad_signature(self):
+        response = await self.apost_event("evt_1", {}, signature="0" * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(await WebhookEvent.objects.aexists())
+
+    async def test_async_rejects_get(self):
+        response = await self.async_client.get("/webhook/async/")
+        self.assertEqual(response.status_code, 405)
+
+    def test_process_events(self):
+        client = FakeClient(plans=1, customers=1, subscriptions=2)
+        sync(client)
+        subscription = client.subscription.fetch("sub_00000001")
+        subscription["status"] = "cancelled"
+        self.post_event("evt_1", {"subscription": {"entity": subscription}})
+
+        command = djrazorpay_process_events.Command()
+        command.client_class = client
+        call_command(command, "key", "secret", stdout=io.StringIO())
+
+        self.assertEqual(
+            Subscription.objects.get(id="sub_00000001").status, "cancelled"
+        )
+        self.assertFalse(WebhookEvent.objects.filter(processed_at=None).exists())
+
+    def test_process_events_skips_stale_events(self):
+        client = FakeClient(plans=1, customers=1, subscriptions=2)
+        sync(client)
+        synced_at = int(time.time())
+        subscription = client.subscription.fetch("sub_00000001")
+        # Older than the sync, e.g. a late redelivery.
+        subscription["status"] = "completed"
+        self.post_event(
+            "evt_1", {"subscription": {"entity": subscription}}, None, synced_at - 60
+        )
+        # Received in the reverse of the order they were created in.
+        subscription["status"] = "halted"
+        self.post_event(
+            "evt_2", {"subscription": {"entity": subscription}}, None, synced_at + 20
+        )
+        subscription["status"] = "cancelled"
+        self.post_event(
+            "evt_3", {"subscription": {"entity": subscription}}, None, synced_at + 10
+        )
+
+        command = djrazorpay_process_events.Command()
+        command.client_class = client
+        call_command(command, "key", "secret", stdout=io.StringIO())
+
+        row = Subscription.objects.get(id="sub_00000001")
+        self.assertEqual(row.status, "halted")
+        self.assertEqual(row.observed_at.timestamp(), synced_at + 20)
+        self.assertFalse(WebhookEvent.objects.filter(processed_at=None).exists())
+
+        # A redelivery of an event older than the stored state is skipped.
+        subscription["status"] = "cancelled"
+        self.post_event(
+            "evt_4", {"subscription": {"entity": subscription}}, None, synced_at + 10
+        )
+        call_command(command, "key", "secret", stdout=io.StringIO())
+        self.assertEqual(Subscription.objects.get(id="sub_00000001").status, "halted")
+
+    def test_process_events_fails_skipped_subscriptions(self):
+        client = FakeClient(plans=2, customers=1, subscriptions=2)
+        # Knows nothing of plan_00000001, which sub_00000001 is on.
+        command = djrazorpay_process_events.Command()
+        command.client_class = FakeClient(plans=1, customers=1, subscriptions=1)
+        subscription = client.subscription.fetch("sub_00000001")
+        self.post_event("evt_1", {"subscription": {"entity": subscription}})
+        call_command(
+            command, "key", "secret", stdout=io.StringIO(), stderr=io.StringIO()
+        )
+
+        event = WebhookEvent.objects.get()
+        self.assertIsNone(event.processed_at)
+        self.assertIn("plan_00000001 not found", event.last_error)
+        self.assertFalse(Subscription.objects.exists())
+
+        sync(client)
+        Subscription.objects.all().delete()
+        call_command(command, "key", "secret", "--retry-failed", stdout=io.StringIO())
+        self.assertIsNotNone(WebhookEvent.objects.get().processed_at)
+        self.assertTrue(Subscription.objects.filter(id="sub_00000001").exists())
+
+    def test_process_events_isolates_failures(self):
+        client = FakeClient(plans=1, customers=1, subscriptions=2)
+        sync(client)
+        broken = client.subscription.fetch("sub_00000000")
+        del broken["created_at"]
+        self.post_event("evt_1", {"subscription": {"entity": broken}})
+        subscription = client.subscription.fetch("sub_00000001")
+        subscription["status"] = "cancelled"
+        self.post_event("evt_2", {"subscription": {"entity": subscription}})
+
+        command = djrazorpay_process_events.Command()
+        command.client_class = client
+        stderr = io.StringIO()
+        call_command(command, "key", "secret", stdout=io.StringIO(), stderr=stderr)
+
+        self.assertEqual(
+            Subscription.objects.get(id="sub_00000001").status, "cancelled"
+        )
+        self.assertIn("evt_1", stderr.getvalue())
+        event = WebhookEvent.objects.get(id="evt_1")
+        self.assertIsNone(event.processed_at)
+        self.assertIsNotNone(event.failed_at)
+        self.assertIn("created_at", event.last_error)
+        self.assertIsNotNone(WebhookEvent.objects.get(id="evt_2").processed_at)
+
+        # Failed events are skipped until retried.
+        call_command(command, "key", "secret", stdout=io.StringIO(), stderr=stderr)
+        call_command(
+            command,
+            "key",
+            "secret",
+            "--retry-failed",
+            stdout=io.StringIO(),
+            stderr=stderr,
+        )
+        self.assertIsNotNone(WebhookEvent.objects.get(id="evt_1").failed_at)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from djrazorpay import views
+
+app_name = "djrazorpay"
+
+urlpatterns = [
+    path("webhook/", views.webhook, name="webhook"),
+    path("webhook/async/", views.webhook_async, name="webhook_async"),
+]
@@ -0,0 +1,18 @@
+import datetime
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Yield successive lists of at most ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def from_timestamp(value: int) -> datetime.datetime:
+    """Convert a Razorpay (Unix) timestamp to an aware UTC datetime."""
+    return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
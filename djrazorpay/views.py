@@ -1,3 +1,78 @@
-from django.shortcuts import render
+import hashlib
+import hmac
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseNotAllowed,
+)
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from djrazorpay.models import WebhookEvent
+
+
+def get_webhook_secret() -> bytes:
+    secret = getattr(settings, "DJRAZORPAY_WEBHOOK_SECRET", None)
+    if not secret:
+        raise ImproperlyConfigured("DJRAZORPAY_WEBHOOK_SECRET is not set.")
+    return secret.encode()
+
+
+def verify_signature(body: bytes, signature: str) -> bool:
+    """Check the ``X-Razorpay-Signature`` HMAC-SHA256 of a webhook body."""
+    expected = hmac.new(get_webhook_secret(), body, hashlib.sha256).hexdigest()
+    # Compared as bytes: compare_digest rejects non-ASCII strings.
+    return hmac.compare_digest(expected.encode(), signature.encode(errors="replace"))
+
+
+@csrf_exempt
+@require_POST
+def webhook(request: HttpRequest) -> HttpResponse:
+    """
+    Receive a Razorpay webhook. The event is only stored here; applying it to
+    the models is left to ``djrazorpay_process_events`` so the request costs a
+    single INSERT. Redeliveries of a stored event are ignored.
+    """
+    event_id = request.headers.get("X-Razorpay-Event-Id")
+    signature = request.headers.get("X-Razorpay-Signature", "")
+    if not event_id:
+        return HttpResponseBadRequest("Missing event id.")
+    if not verify_signature(request.body, signature):
+        return HttpResponseBadRequest("Invalid signature.")
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(id=event_id, body=request.body.decode())],
+        ignore_conflicts=True,
+    )
+    return HttpResponse()
+
+
+async def webhook_async(request: HttpRequest) -> HttpResponse:
+    """
+    ``webhook`` for ASGI deployments. Signature verification runs in a worker
+    thread and the INSERT goes through the async ORM, so the event loop keeps
+    serving other deliveries meanwhile.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    event_id = request.headers.get("X-Razorpay-Event-Id")
+    signature = request.headers.get("X-Razorpay-Signature", "")
+    if not event_id:
+        return HttpResponseBadRequest("Missing event id.")
+    verify = sync_to_async(verify_signature, thread_sensitive=False)
+    if not await verify(request.body, signature):
+        return HttpResponseBadRequest("Invalid signature.")
+    await WebhookEvent.objects.abulk_create(
+        [WebhookEvent(id=event_id, body=request.body.decode())],
+        ignore_conflicts=True,
+    )
+    return HttpResponse()
+
+
+# Set directly rather than with @csrf_exempt, whose wrapper is only
+# coroutine-aware from Django 5.0.
+webhook_async.csrf_exempt = True
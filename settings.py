@@ -1,5 +1,11 @@
 import os
 
+import django
+
+SECRET_KEY = "djrazorpay-insecure-test-key"
+
+ROOT_URLCONF = "djrazorpay.urls"
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -38,5 +44,10 @@ DATABASES = {
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
         # use a on-disk db for test so --reuse-db can be used
         "TEST": {"NAME": os.path.join(BASE_DIR, "test_db.sqlite3")},
+        "OPTIONS": {"timeout": 20},
     }
 }
+if django.VERSION >= (5, 1):
+    # Take the write lock up front so concurrent sync processes wait for
+    # each other instead of failing with "database is locked".
+    DATABASES["default"]["OPTIONS"]["transaction_mode"] = "IMMEDIATE"